@@ -1,13 +1,35 @@
-from fastapi import APIRouter, Depends, Header, HTTPException, Request
-from fastapi.responses import JSONResponse
+import asyncio
+import functools
+import hashlib
+import json
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Type, Union
 
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import ResponseValidationError
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from ..core.config import settings
 from ..core.logging import get_logger
 from ..core.security import hash_api_key, create_rate_limit_key, validate_api_key
-from ..models.requests import DiagramRequest
-from ..models.responses import DiagramResponse, ErrorResponse
-from ..services.materials_client import MaterialsProjectClient
+from ..models.requests import (
+    ChemicalPotentialRequest, DiagramRequest, ExportRequest, HeatmapRequest, ReactionProfileRequest,
+    StabilityQueryRequest
+)
+from ..models.responses import (
+    ChemicalPotentialResponse, DiagramResponse, ErrorResponse, HeatmapResponse, PhaseDataResponse,
+    ReactionProfileResponse, StabilityQueryResponse
+)
+from ..services.admission import AdmissionRejected, admission, job_cost
+from ..services.client_pool import PoolSaturated
+from ..services.deadline import Deadline, RequestCancelled
+from ..services.export import MEDIA_TYPES, arrow_available, stream_phase_tables
+from ..services.materials_client import MaterialsProjectClient, MaterialsProjectUnavailable
 from ..services.phase_analyzer import PhaseAnalyzer
 from ..services.rate_limiter import rate_limiter
+from ..services.request_capture import request_capture
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/diagrams", tags=["diagrams"])
@@ -21,20 +43,15 @@ def get_client_ip(request: Request) -> str:
     return request.client.host or "unknown"
 
 
-@router.post("/", response_model=DiagramResponse)
-async def generate_diagram(
-    request: DiagramRequest,
-    x_api_key: str = Header(..., alias="X-API-KEY"),
-    client_ip: str = Depends(get_client_ip)
-):
+def authorize_request(api_key: str, client_ip: str) -> str:
     """
-    Generate a phase diagram with detailed phase information.
+    Validate the API key format and apply rate limiting.
     
-    This endpoint creates a phase diagram using Materials Project data
-    and returns both the plot data and detailed phase information.
+    Returns:
+        Hashed API key for logging
     """
     # Validate API key format
-    if not validate_api_key(x_api_key):
+    if not validate_api_key(api_key):
         logger.warning(f"Invalid API key format from IP: {client_ip}")
         raise HTTPException(
             status_code=401,
@@ -42,7 +59,7 @@ async def generate_diagram(
         )
     
     # Create rate limiting key
-    api_key_hash = hash_api_key(x_api_key)
+    api_key_hash = hash_api_key(api_key)
     rate_limit_key = create_rate_limit_key(api_key_hash, client_ip)
     
     # Check rate limit
@@ -54,27 +71,144 @@ async def generate_diagram(
             headers={"Retry-After": str(int(remaining_time))}
         )
     
+    return api_key_hash
+
+
+def etag_response(payload, response_model: Type[BaseModel], if_none_match: Optional[str]) -> Response:
+    """
+    Serialize a response through its response model with a content-hash ETag.
+    
+    Returns an empty 304 when the client's If-None-Match already holds the
+    same ETag, so revalidating a browser-cached diagram skips the body.
+    
+    Raises:
+        ResponseValidationError: If the payload does not fit the model or
+            holds non-finite numbers, which JSON cannot represent
+    """
+    try:
+        validated = response_model.parse_obj(jsonable_encoder(payload))
+        body = json.dumps(jsonable_encoder(validated), separators=(",", ":"), allow_nan=False).encode()
+    except ValidationError as e:
+        raise ResponseValidationError(e.errors(), body=payload)
+    except ValueError as e:
+        raise ResponseValidationError([{"type": "serialization", "msg": str(e)}], body=payload)
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def run_until_disconnected(http_request: Request, deadline: Deadline, job: Callable[[], Any]):
+    """
+    Run a blocking job in the threadpool while watching the client connection.
+    
+    If the client disconnects the deadline is cancelled, so the job stops at
+    its next stage boundary instead of finishing for nobody.
+    """
+    task = asyncio.ensure_future(run_in_threadpool(job))
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=settings.disconnect_poll_interval)
+        if done:
+            return task.result()
+        if not deadline.cancelled and await http_request.is_disconnected():
+            deadline.cancel("client disconnected")
+
+
+async def stream_until_disconnected(deadline: Deadline, chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Stream a blocking iterator from the threadpool.
+    
+    If the response is abandoned before the iterator is exhausted, e.g.
+    because the client disconnected, the deadline is cancelled so the diagram
+    being built stops at its next stage boundary.
+    """
+    finished = False
+    try:
+        async for chunk in iterate_in_threadpool(chunks):
+            yield chunk
+        finished = True
+    finally:
+        if not finished:
+            deadline.cancel("client disconnected")
+
+
+def unavailable_error(e: Union[MaterialsProjectUnavailable, AdmissionRejected, PoolSaturated]) -> HTTPException:
+    """503 with Retry-After for an upstream outage or a server or API key at capacity."""
+    logger.warning(f"Service unavailable: {str(e)}")
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after or 1)}
+    )
+
+
+def cancelled_error(e: RequestCancelled) -> HTTPException:
+    """504 for a request over its time budget, 499 for one nobody is waiting for."""
+    if e.timed_out:
+        return HTTPException(status_code=504, detail=str(e))
+    return HTTPException(status_code=499, detail=str(e))
+
+
+@router.post("/", response_model=DiagramResponse)
+async def generate_diagram(
+    request: DiagramRequest,
+    http_request: Request,
+    x_api_key: str = Header(..., alias="X-API-KEY"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    client_ip: str = Depends(get_client_ip)
+):
+    """
+    Generate a phase diagram with detailed phase information.
+    
+    This endpoint creates a phase diagram using Materials Project data
+    and returns both the plot data and detailed phase information.
+    Responses carry an ETag; send it back in If-None-Match to get a 304
+    when the diagram is unchanged. Work stops early if the client disconnects
+    or the request exceeds request_timeout.
+    """
+    api_key_hash = authorize_request(x_api_key, client_ip)
+    
     # Log request details
     logger.info(f"API Request: formulas={request.formulas}, T={request.temperature}K, "
                f"e_cut={request.energy_cutoff}, functional={request.functional}, "
                f"key_hash={api_key_hash}, IP={client_ip}")
+    request_capture.record("/api/diagrams/", request)
     
     try:
         # Create services
         materials_client = MaterialsProjectClient(x_api_key)
         phase_analyzer = PhaseAnalyzer(materials_client)
+        deadline = Deadline()
         
         # Generate phase diagram
-        result = phase_analyzer.generate_phase_diagram(
+        result = await run_until_disconnected(http_request, deadline, functools.partial(
+            admission.run,
+            phase_analyzer.generate_phase_diagram,
+            key=api_key_hash,
+            cost=job_cost(len(request.formulas)),
             formulas=request.formulas,
             temperature=request.temperature,
             energy_cutoff=request.energy_cutoff,
             functional=request.functional,
-            api_key=x_api_key
-        )
+            api_key=x_api_key,
+            include_plot=request.include_plot,
+            deadline=deadline,
+            plot_formulas=request.plot_formulas,
+            custom_entries=request.custom_computed_entries()
+        ))
         
         logger.info(f"Diagram generated successfully: {len(result.phase_info)} phases")
-        return result
+        return etag_response(result, DiagramResponse, if_none_match)
+        
+    except (MaterialsProjectUnavailable, AdmissionRejected, PoolSaturated) as e:
+        # Upstream outage or server at capacity, not the client's fault
+        raise unavailable_error(e)
+        
+    except RequestCancelled as e:
+        # Over the time budget, or nobody is waiting for the response
+        raise cancelled_error(e)
         
     except ValueError as e:
         # Client errors (bad input, invalid API key, etc.)
@@ -87,4 +221,322 @@ async def generate_diagram(
         raise HTTPException(
             status_code=500,
             detail="Internal server error occurred while generating phase diagram"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/data", response_model=PhaseDataResponse)
+async def phase_data(
+    request: DiagramRequest,
+    http_request: Request,
+    x_api_key: str = Header(..., alias="X-API-KEY"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    client_ip: str = Depends(get_client_ip)
+):
+    """
+    Return the phase table and hull distances without generating a plot.
+    
+    Lightweight alternative to the main endpoint for programmatic clients;
+    include_plot is ignored. Work stops early if the client disconnects or
+    the request exceeds request_timeout.
+    """
+    api_key_hash = authorize_request(x_api_key, client_ip)
+    
+    logger.info(f"Phase Data: formulas={request.formulas}, T={request.temperature}K, "
+               f"e_cut={request.energy_cutoff}, functional={request.functional}, "
+               f"key_hash={api_key_hash}, IP={client_ip}")
+    request_capture.record("/api/diagrams/data", request)
+    
+    try:
+        materials_client = MaterialsProjectClient(x_api_key)
+        phase_analyzer = PhaseAnalyzer(materials_client)
+        deadline = Deadline()
+        
+        result = await run_until_disconnected(http_request, deadline, functools.partial(
+            admission.run,
+            phase_analyzer.get_phase_data,
+            key=api_key_hash,
+            cost=job_cost(len(request.formulas)),
+            formulas=request.formulas,
+            temperature=request.temperature,
+            energy_cutoff=request.energy_cutoff,
+            functional=request.functional,
+            custom_entries=request.custom_computed_entries(),
+            deadline=deadline
+        ))
+        return etag_response(result, PhaseDataResponse, if_none_match)
+        
+    except (MaterialsProjectUnavailable, AdmissionRejected, PoolSaturated) as e:
+        raise unavailable_error(e)
+        
+    except RequestCancelled as e:
+        raise cancelled_error(e)
+        
+    except ValueError as e:
+        logger.warning(f"Client error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+        
+    except Exception as e:
+        logger.error(f"Server error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error occurred while computing phase data"
+        )
+
+
+@router.post("/export")
+async def export_phase_tables(
+    request: ExportRequest,
+    http_request: Request,
+    x_api_key: str = Header(..., alias="X-API-KEY"),
+    client_ip: str = Depends(get_client_ip)
+):
+    """
+    Stream the phase tables of one or many diagrams as CSV, NDJSON or Arrow IPC.
+    
+    Rows are sent as each diagram finishes. Systems that fail are exported
+    as a single row with the error column set. The export gets request_timeout
+    per diagram and stops early if the client disconnects.
+    """
+    api_key_hash = authorize_request(x_api_key, client_ip)
+    
+    logger.info(f"Export: {len(request.requests)} diagrams as {request.format}, "
+               f"key_hash={api_key_hash}, IP={client_ip}")
+    request_capture.record("/api/diagrams/export", request)
+    
+    if request.format == "arrow" and not arrow_available():
+        raise HTTPException(status_code=400, detail="Arrow export requires pyarrow on the server")
+    
+    phase_analyzer = PhaseAnalyzer(MaterialsProjectClient(x_api_key))
+    extension = {"csv": "csv", "ndjson": "ndjson", "arrow": "arrows"}[request.format]
+    deadline = Deadline(settings.request_timeout * len(request.requests))
+    chunks = stream_phase_tables(
+        phase_analyzer, request.requests, request.format, key=api_key_hash, deadline=deadline
+    )
+    
+    return StreamingResponse(
+        stream_until_disconnected(deadline, chunks),
+        media_type=MEDIA_TYPES[request.format],
+        headers={"Content-Disposition": f'attachment; filename="phase_tables.{extension}"'}
+    )
+
+
+@router.post("/stability", response_model=StabilityQueryResponse)
+async def query_stability(
+    request: StabilityQueryRequest,
+    http_request: Request,
+    x_api_key: str = Header(..., alias="X-API-KEY"),
+    client_ip: str = Depends(get_client_ip)
+):
+    """
+    Evaluate energy above hull and decomposition for many compositions.
+    
+    The phase diagram of the chemical system is built once (or reused from
+    the cache) and all compositions are evaluated in one vectorized pass.
+    """
+    api_key_hash = authorize_request(x_api_key, client_ip)
+    
+    logger.info(f"Stability Query: chemsys={request.chemsys}, n={len(request.compositions)}, "
+               f"T={request.temperature}K, functional={request.functional}, "
+               f"key_hash={api_key_hash}, IP={client_ip}")
+    request_capture.record("/api/diagrams/stability", request)
+    
+    try:
+        materials_client = MaterialsProjectClient(x_api_key)
+        phase_analyzer = PhaseAnalyzer(materials_client)
+        deadline = Deadline()
+        
+        return await run_until_disconnected(http_request, deadline, functools.partial(
+            admission.run,
+            phase_analyzer.query_stability,
+            key=api_key_hash,
+            cost=job_cost(len(request.chemsys.split("-"))),
+            elements=request.chemsys.split("-"),
+            compositions=request.compositions,
+            temperature=request.temperature,
+            functional=request.functional,
+            deadline=deadline
+        ))
+        
+    except (MaterialsProjectUnavailable, AdmissionRejected, PoolSaturated) as e:
+        raise unavailable_error(e)
+        
+    except RequestCancelled as e:
+        raise cancelled_error(e)
+        
+    except ValueError as e:
+        logger.warning(f"Client error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+        
+    except Exception as e:
+        logger.error(f"Server error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error occurred while evaluating stability"
+        )
+
+
+@router.post("/reaction-profile", response_model=ReactionProfileResponse)
+async def reaction_profile(
+    request: ReactionProfileRequest,
+    http_request: Request,
+    x_api_key: str = Header(..., alias="X-API-KEY"),
+    client_ip: str = Depends(get_client_ip)
+):
+    """
+    Compute the reaction energy versus mixing ratio between two terminals.
+    
+    Uses the same (cached) compound phase diagram as the main diagram endpoint.
+    """
+    api_key_hash = authorize_request(x_api_key, client_ip)
+    
+    logger.info(f"Reaction Profile: formulas={request.formulas}, reactants={request.reactants}, "
+               f"n={request.num_points}, T={request.temperature}K, functional={request.functional}, "
+               f"key_hash={api_key_hash}, IP={client_ip}")
+    request_capture.record("/api/diagrams/reaction-profile", request)
+    
+    try:
+        materials_client = MaterialsProjectClient(x_api_key)
+        phase_analyzer = PhaseAnalyzer(materials_client)
+        deadline = Deadline()
+        
+        return await run_until_disconnected(http_request, deadline, functools.partial(
+            admission.run,
+            phase_analyzer.get_reaction_profile,
+            key=api_key_hash,
+            cost=job_cost(len(request.formulas)),
+            formulas=request.formulas,
+            reactants=request.reactants,
+            temperature=request.temperature,
+            energy_cutoff=request.energy_cutoff,
+            functional=request.functional,
+            num_points=request.num_points,
+            deadline=deadline
+        ))
+        
+    except (MaterialsProjectUnavailable, AdmissionRejected, PoolSaturated) as e:
+        raise unavailable_error(e)
+        
+    except RequestCancelled as e:
+        raise cancelled_error(e)
+        
+    except ValueError as e:
+        logger.warning(f"Client error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+        
+    except Exception as e:
+        logger.error(f"Server error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error occurred while computing reaction profile"
+        )
+
+
+@router.post("/heatmap", response_model=HeatmapResponse)
+async def stability_heatmap(
+    request: HeatmapRequest,
+    http_request: Request,
+    x_api_key: str = Header(..., alias="X-API-KEY"),
+    client_ip: str = Depends(get_client_ip)
+):
+    """
+    Compute an energy-above-hull heatmap over the simplex spanned by the formulas.
+    
+    Uses the same (cached) compound phase diagram as the main diagram endpoint.
+    """
+    api_key_hash = authorize_request(x_api_key, client_ip)
+    
+    logger.info(f"Heatmap: formulas={request.formulas}, resolution={request.resolution}, "
+               f"T={request.temperature}K, functional={request.functional}, "
+               f"key_hash={api_key_hash}, IP={client_ip}")
+    request_capture.record("/api/diagrams/heatmap", request)
+    
+    try:
+        materials_client = MaterialsProjectClient(x_api_key)
+        phase_analyzer = PhaseAnalyzer(materials_client)
+        deadline = Deadline()
+        
+        return await run_until_disconnected(http_request, deadline, functools.partial(
+            admission.run,
+            phase_analyzer.get_stability_heatmap,
+            key=api_key_hash,
+            cost=job_cost(len(request.formulas)),
+            formulas=request.formulas,
+            temperature=request.temperature,
+            energy_cutoff=request.energy_cutoff,
+            functional=request.functional,
+            resolution=request.resolution,
+            deadline=deadline
+        ))
+        
+    except (MaterialsProjectUnavailable, AdmissionRejected, PoolSaturated) as e:
+        raise unavailable_error(e)
+        
+    except RequestCancelled as e:
+        raise cancelled_error(e)
+        
+    except ValueError as e:
+        logger.warning(f"Client error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+        
+    except Exception as e:
+        logger.error(f"Server error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error occurred while computing stability heatmap"
+        )
+
+
+@router.post("/chempot", response_model=ChemicalPotentialResponse)
+async def chemical_potential_diagram(
+    request: ChemicalPotentialRequest,
+    http_request: Request,
+    x_api_key: str = Header(..., alias="X-API-KEY"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    client_ip: str = Depends(get_client_ip)
+):
+    """
+    Return the chemical potential diagram of the system as domain polygons.
+    
+    Takes the same request as the main endpoint, without custom_entries, and
+    reuses its cached entries; only formulas, temperature and functional are
+    used.
+    """
+    api_key_hash = authorize_request(x_api_key, client_ip)
+    
+    logger.info(f"Chemical Potential Diagram: formulas={request.formulas}, T={request.temperature}K, "
+               f"functional={request.functional}, key_hash={api_key_hash}, IP={client_ip}")
+    request_capture.record("/api/diagrams/chempot", request)
+    
+    try:
+        materials_client = MaterialsProjectClient(x_api_key)
+        phase_analyzer = PhaseAnalyzer(materials_client)
+        deadline = Deadline()
+        
+        result = await run_until_disconnected(http_request, deadline, functools.partial(
+            admission.run,
+            phase_analyzer.get_chemical_potential_diagram,
+            key=api_key_hash,
+            cost=job_cost(len(request.formulas)),
+            formulas=request.formulas,
+            temperature=request.temperature,
+            functional=request.functional,
+            deadline=deadline
+        ))
+        return etag_response(result, ChemicalPotentialResponse, if_none_match)
+        
+    except (MaterialsProjectUnavailable, AdmissionRejected, PoolSaturated) as e:
+        raise unavailable_error(e)
+        
+    except RequestCancelled as e:
+        raise cancelled_error(e)
+        
+    except ValueError as e:
+        logger.warning(f"Client error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+        
+    except Exception as e:
+        logger.error(f"Server error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error occurred while computing chemical potential diagram"
+        )
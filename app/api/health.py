@@ -1,8 +1,13 @@
 from datetime import datetime
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 
 from ..core.config import settings
-from ..models.responses import HealthResponse
+from ..models.responses import HealthResponse, ReadinessResponse
+from ..services.admission import admission
+from ..services.cache import diagram_cache, entry_cache
+from ..services.circuit_breaker import mp_breaker
+from ..services.client_pool import client_pool
 
 router = APIRouter(prefix="/health", tags=["health"])
 
@@ -15,4 +20,26 @@ async def health_check():
         app_name=settings.app_name,
         version=settings.app_version,
         timestamp=datetime.utcnow().isoformat()
-    )
\ No newline at end of file
+    )
+
+
+@router.get("/ready", response_model=ReadinessResponse)
+async def readiness_check():
+    """
+    Readiness endpoint for load balancers and autoscalers.
+    
+    Reports running and queued diagram jobs, cache sizes and the Materials
+    Project circuit state. Returns 503 while the job queue is full.
+    """
+    saturated = admission.saturated
+    
+    readiness = ReadinessResponse(
+        status="saturated" if saturated else "ready",
+        **admission.stats(),
+        cache_sizes={"entry_cache": len(entry_cache), "diagram_cache": len(diagram_cache)},
+        mp_circuit_open=mp_breaker.is_open,
+        mp_clients=len(client_pool),
+        timestamp=datetime.utcnow().isoformat()
+    )
+    
+    return JSONResponse(status_code=503 if saturated else 200, content=readiness.dict())
\ No newline at end of file
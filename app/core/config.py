@@ -29,10 +29,70 @@ class Settings(BaseSettings):
     # Energy constraints
     default_energy_cutoff: float = 0.2
     max_energy_cutoff: float = 2.0
+    prune_entries: bool = True  # drop polymorphs above the cutoff before hull construction
+    prune_margin: float = 0.05  # eV/atom
     
     # Formula constraints
     min_formulas: int = 2
-    max_formulas: int = 4
+    max_formulas: int = 4  # most that can be plotted
+    max_unplotted_formulas: int = 7  # without a plot, or plotted as a slice of up to max_formulas
+    
+    # Materials Project client pool
+    mp_pool_max_clients: int = 32
+    mp_pool_idle_seconds: int = 300
+    mp_max_concurrent_per_key: int = 4
+    mp_parallel_fetch: bool = True  # fetch chemical systems as parallel subsystem queries
+    mp_parallel_min_elements: int = 3
+    mp_max_elements: int = 9  # largest chemical system fetched (2^n - 1 subsystem queries)
+    mp_fetch_workers: int = 4
+    mp_slim_fetch: bool = True  # request only hull fields at 0 K
+    mp_acquire_timeout: float = 30.0  # seconds
+    
+    # Materials Project resilience
+    mp_retry_attempts: int = 3
+    mp_retry_backoff: float = 0.5  # seconds, doubled after each attempt
+    mp_fetch_deadline: float = 60.0  # seconds across all attempts
+    mp_breaker_failures: int = 5
+    mp_breaker_reset: float = 30.0  # seconds
+    mp_refresh_workers: int = 2
+    
+    # Admission control
+    max_concurrent_jobs: int = 4  # diagram jobs running at once
+    max_queued_jobs: int = 16  # jobs waiting for a slot before requests are shed
+    queue_timeout: float = 30.0  # seconds
+    max_jobs_per_key: int = 2  # running jobs per API key
+    max_queued_per_key: int = 8  # waiting jobs per API key
+    request_timeout: float = 120.0  # seconds a diagram request may take before it is abandoned
+    disconnect_poll_interval: float = 0.5  # seconds between client disconnect checks
+    
+    # Caching
+    cache_ttl: int = 3600  # seconds
+    cache_stale_ttl: int = 86400  # seconds past cache_ttl that entries are served while refreshing
+    cache_max_size: int = 32
+    
+    # Hull queries
+    max_query_compositions: int = 1000
+    max_custom_entries: int = 50  # user-supplied entries merged into a diagram
+    default_profile_points: int = 201
+    max_profile_points: int = 5001
+    default_heatmap_resolution: int = 50
+    max_heatmap_resolution: int = 100
+    max_chempot_elements: int = 5  # chemical potential diagrams are built in element space
+    chempot_min_potential: float = -50.0  # lower bound of formal chemical potentials (eV/atom)
+    
+    # Export
+    max_export_requests: int = 50
+    
+    # Plot rendering
+    plot_native: bool = True  # vectorized trace builder; False falls back to PDPlotter
+    plot_decimate: bool = True  # merge overlapping unstable points
+    plot_decimate_resolution: int = 100  # grid cells per plot axis
+    plot_decimate_threshold: int = 1000  # marker points above which unstable points are decimated
+    plot_webgl_threshold: int = 1000  # marker points above which 2D traces use WebGL
+    
+    # Request capture
+    capture_requests: bool = False  # record API request parameters for benchmarks/replay.py
+    capture_file: str = "requests_capture.ndjson"
     
     # Logging
     log_level: str = "INFO"
@@ -11,6 +11,7 @@ from .models.requests import FormDiagramRequest
 from .models.responses import ErrorResponse
 from .api.diagrams import router as diagrams_router
 from .api.health import router as health_router
+from .services.client_pool import client_pool
 
 # Setup logging
 logger = setup_logging()
@@ -145,6 +146,7 @@ async def startup_event():
 async def shutdown_event():
     """Application shutdown event."""
     logger.info(f"Shutting down {settings.app_name}")
+    client_pool.close_all()
 
 
 if __name__ == "__main__":
@@ -1,9 +1,69 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field, validator
+from pymatgen.core.composition import Composition
+from pymatgen.entries.computed_entries import ComputedEntry
 
 from ..core.config import settings
 
 
+def check_temperature(v: int) -> int:
+    """Validate a temperature (0 K or within the supported range)."""
+    if v != 0 and not (settings.min_temperature <= v <= settings.max_temperature):
+        raise ValueError(
+            f"Temperature must be 0 K or between {settings.min_temperature}-{settings.max_temperature} K"
+        )
+    return v
+
+
+def check_functional(v: str) -> str:
+    """Validate a DFT functional name."""
+    if v not in settings.supported_functionals:
+        raise ValueError(f"Unsupported functional: {v}. Supported: {settings.supported_functionals}")
+    return v
+
+
+def check_no_custom_entries(v: list) -> list:
+    """Reject custom entries on endpoints that do not merge them into the diagram."""
+    if v:
+        raise ValueError("custom_entries are only supported by the diagram and phase data endpoints")
+    return v
+
+
+class CustomEntry(BaseModel):
+    """A user-computed phase to place on the Materials Project hull."""
+    
+    formula: str = Field(..., description="Chemical formula of the phase")
+    energy_per_atom: float = Field(
+        ...,
+        allow_inf_nan=False,
+        description="Energy in eV/atom on the same scale as the Materials Project entries "
+                    "of the selected functional and temperature (including corrections)"
+    )
+    name: Optional[str] = Field(
+        default=None,
+        max_length=64,
+        description="Label shown as the entry ID"
+    )
+    
+    @validator('formula')
+    def validate_formula(cls, v):
+        v = v.strip()
+        try:
+            Composition(v)
+        except Exception:
+            raise ValueError(f"Invalid chemical formula: {v}")
+        return v
+    
+    def to_entry(self, default_id: str) -> ComputedEntry:
+        """Convert to a pymatgen entry with the given ID unless a name is set."""
+        composition = Composition(self.formula)
+        return ComputedEntry(
+            composition,
+            self.energy_per_atom * composition.num_atoms,
+            entry_id=self.name or default_id
+        )
+
+
 class DiagramRequest(BaseModel):
     """Request model for phase diagram generation."""
     
@@ -11,7 +71,7 @@ class DiagramRequest(BaseModel):
         ..., 
         alias="f",
         min_items=settings.min_formulas,
-        max_items=settings.max_formulas,
+        max_items=settings.max_unplotted_formulas,
         description="List of chemical formulas"
     )
     temperature: int = Field(
@@ -30,20 +90,27 @@ class DiagramRequest(BaseModel):
         default=settings.default_functional,
         description="DFT functional type"
     )
+    include_plot: bool = Field(
+        default=True,
+        description="Include the Plotly figure (False returns only phase data)"
+    )
+    plot_formulas: Optional[List[str]] = Field(
+        default=None,
+        description="Up to 4 of the formulas to plot as a slice of a larger system"
+    )
+    custom_entries: List[CustomEntry] = Field(
+        default_factory=list,
+        max_items=settings.max_custom_entries,
+        description="Custom phases merged with the Materials Project entries"
+    )
     
     @validator('temperature')
     def validate_temperature(cls, v):
-        if v != 0 and not (settings.min_temperature <= v <= settings.max_temperature):
-            raise ValueError(
-                f"Temperature must be 0 K or between {settings.min_temperature}-{settings.max_temperature} K"
-            )
-        return v
+        return check_temperature(v)
     
     @validator('functional')
     def validate_functional(cls, v):
-        if v not in settings.supported_functionals:
-            raise ValueError(f"Unsupported functional: {v}. Supported: {settings.supported_functionals}")
-        return v
+        return check_functional(v)
     
     @validator('formulas')
     def validate_formulas(cls, v):
@@ -51,9 +118,85 @@ class DiagramRequest(BaseModel):
         cleaned = [f.strip() for f in v if f.strip()]
         if len(cleaned) < settings.min_formulas:
             raise ValueError(f"At least {settings.min_formulas} chemical formulas are required")
-        if len(cleaned) > settings.max_formulas:
-            raise ValueError(f"Maximum {settings.max_formulas} formulas allowed")
+        if len(cleaned) > settings.max_unplotted_formulas:
+            raise ValueError(f"Maximum {settings.max_unplotted_formulas} formulas allowed")
+        return cleaned
+    
+    @validator('plot_formulas')
+    def validate_plot_formulas(cls, v, values):
+        formulas = values.get('formulas')
+        if v is None or formulas is None:
+            return v
+        cleaned = list(dict.fromkeys(f.strip() for f in v if f.strip()))
+        if not settings.min_formulas <= len(cleaned) <= settings.max_formulas:
+            raise ValueError(
+                f"plot_formulas must list {settings.min_formulas}-{settings.max_formulas} formulas"
+            )
+        missing = [f for f in cleaned if f not in formulas]
+        if missing:
+            raise ValueError(f"plot_formulas must be a subset of the formulas, got {missing}")
         return cleaned
+    
+    def custom_computed_entries(self) -> List[ComputedEntry]:
+        """Custom entries as pymatgen entries, with IDs custom-1, custom-2, ... unless named."""
+        return [entry.to_entry(f"custom-{idx + 1}") for idx, entry in enumerate(self.custom_entries)]
+
+
+class ReactionProfileRequest(DiagramRequest):
+    """Request model for the reaction energy profile between two terminals."""
+    
+    reactants: List[str] = Field(
+        ...,
+        min_items=2,
+        max_items=2,
+        description="Two of the input formulas to mix"
+    )
+    num_points: int = Field(
+        default=settings.default_profile_points,
+        ge=3,
+        le=settings.max_profile_points,
+        description="Number of mixing ratios evaluated between the reactants"
+    )
+    
+    @validator('reactants')
+    def validate_reactants(cls, v):
+        cleaned = [r.strip() for r in v]
+        if not all(cleaned) or cleaned[0] == cleaned[1]:
+            raise ValueError("Two different reactant formulas are required")
+        return cleaned
+    
+    @validator('custom_entries')
+    def validate_custom_entries(cls, v):
+        return check_no_custom_entries(v)
+
+
+class HeatmapRequest(DiagramRequest):
+    """Request model for the stability heatmap over the terminal simplex."""
+    
+    resolution: int = Field(
+        default=settings.default_heatmap_resolution,
+        ge=1,
+        le=settings.max_heatmap_resolution,
+        description="Number of grid divisions along each edge of the simplex"
+    )
+    
+    @validator('formulas')
+    def validate_heatmap_formulas(cls, v):
+        if len(v) > settings.max_formulas:
+            raise ValueError(f"Heatmaps support at most {settings.max_formulas} formulas")
+        return v
+    
+    @validator('custom_entries')
+    def validate_custom_entries(cls, v):
+        return check_no_custom_entries(v)
+
+
+class ChemicalPotentialRequest(DiagramRequest):
+    """Request model for the chemical potential diagram of the formulas' system."""
+    
+    @validator('custom_entries')
+    def validate_custom_entries(cls, v):
+        return check_no_custom_entries(v)
 
 
 class FormDiagramRequest(BaseModel):
@@ -80,4 +223,76 @@ class FormDiagramRequest(BaseModel):
             temp=temp_int,
             e_cut=self.e_cut,
             functional=self.functional
-        )
\ No newline at end of file
+        )
+
+
+class StabilityQueryRequest(BaseModel):
+    """Request model for batch hull-distance and decomposition queries."""
+    
+    chemsys: str = Field(
+        ...,
+        description="Chemical system as dash-separated elements, e.g. Ba-O-Si"
+    )
+    compositions: List[str] = Field(
+        ...,
+        min_items=1,
+        max_items=settings.max_query_compositions,
+        description="Chemical formulas to evaluate against the hull"
+    )
+    temperature: int = Field(
+        default=settings.default_temperature,
+        alias="temp",
+        description="Temperature in Kelvin (0 or 300-2000)"
+    )
+    functional: str = Field(
+        default=settings.default_functional,
+        description="DFT functional type"
+    )
+    
+    @validator('temperature')
+    def validate_temperature(cls, v):
+        return check_temperature(v)
+    
+    @validator('functional')
+    def validate_functional(cls, v):
+        return check_functional(v)
+    
+    @validator('chemsys')
+    def validate_chemsys(cls, v):
+        elements = sorted({el.strip() for el in v.split("-") if el.strip()})
+        if len(elements) < settings.min_formulas:
+            raise ValueError(f"Chemical system must contain at least {settings.min_formulas} elements")
+        if len(elements) > settings.max_unplotted_formulas:
+            raise ValueError(
+                f"Chemical system may contain at most {settings.max_unplotted_formulas} elements"
+            )
+        return "-".join(elements)
+    
+    @validator('compositions')
+    def validate_compositions(cls, v):
+        cleaned = [c.strip() for c in v if c.strip()]
+        if not cleaned:
+            raise ValueError("At least one composition is required")
+        return cleaned
+
+
+class ExportRequest(BaseModel):
+    """Request model for bulk export of phase tables."""
+    
+    requests: List[DiagramRequest] = Field(
+        ...,
+        min_items=1,
+        max_items=settings.max_export_requests,
+        description="Diagrams whose phase tables are exported, in order"
+    )
+    format: str = Field(
+        default="csv",
+        description="Output format: csv, ndjson or arrow"
+    )
+    
+    @validator('format')
+    def validate_format(cls, v):
+        v = v.lower()
+        if v not in ("csv", "ndjson", "arrow"):
+            raise ValueError(f"Unsupported export format: {v}. Supported: csv, ndjson, arrow")
+        return v
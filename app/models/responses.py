@@ -24,13 +24,139 @@ class DiagramMetadata(BaseModel):
     e_cut: float
     functional: str
     num_phases: int
+    num_entries: Optional[int] = None
+    num_pruned: Optional[int] = None
+    num_decimated: Optional[int] = None
+    plot_formulas: Optional[List[str]] = None
+    num_custom: Optional[int] = None
+
+
+class CustomPhase(BaseModel):
+    """Position of a user-supplied entry relative to the merged hull."""
+    
+    formula: str
+    entry_id: str
+    energy_per_atom: float
+    e_above_hull: float
+    stable: bool
 
 
 class DiagramResponse(BaseModel):
     """Response model for phase diagram generation."""
     
-    plot: Dict[str, Any]
+    plot: Optional[Dict[str, Any]] = None
+    phase_info: List[PhaseInfo]
+    metadata: DiagramMetadata
+    custom_phases: Optional[List[CustomPhase]] = None
+
+
+class UnstablePhase(BaseModel):
+    """Lowest-energy unstable entry of a composition within the energy cutoff."""
+    
+    formula: str
+    entry_id: str
+    energy_per_atom: float
+    formation_energy_per_atom: float
+    e_above_hull: float
+
+
+class PhaseDataResponse(BaseModel):
+    """Phase table and hull data of a diagram, without the plot."""
+    
     phase_info: List[PhaseInfo]
+    unstable_phases: List[UnstablePhase]
+    metadata: DiagramMetadata
+    custom_phases: Optional[List[CustomPhase]] = None
+
+
+class DecompositionProduct(BaseModel):
+    """A stable phase in the decomposition of a composition."""
+    
+    formula: str
+    entry_id: str
+    fraction: float
+
+
+class StabilityResult(BaseModel):
+    """Hull distance and decomposition for a single queried composition."""
+    
+    composition: str
+    reduced_formula: str
+    hull_energy_per_atom: float
+    formation_energy_per_atom: float
+    e_above_hull: Optional[float]
+    entry_id: Optional[str]
+    decomposition: List[DecompositionProduct]
+
+
+class StabilityMetadata(BaseModel):
+    """Metadata about a batch stability query."""
+    
+    temperature: int
+    elements: List[str]
+    functional: str
+    num_entries: int
+    num_stable: int
+
+
+class StabilityQueryResponse(BaseModel):
+    """Response model for batch stability queries."""
+    
+    results: List[StabilityResult]
+    metadata: StabilityMetadata
+
+
+class ReactionProfileResponse(BaseModel):
+    """Reaction energy along the tie line between two terminals."""
+    
+    reactants: List[str]
+    mixing_ratio: float
+    reaction_energy_per_atom: float
+    products: List[DecompositionProduct]
+    ratios: List[float]
+    energies: List[float]
+    metadata: DiagramMetadata
+
+
+class HeatmapResponse(BaseModel):
+    """
+    Energy above hull of the unreacted terminal mixture over a composition grid.
+    
+    Grid points are the integer compositions (n_1, ..., n_k) with
+    sum(n_i) == resolution, ordered lexicographically by n_1 ... n_(k-1).
+    facets[i] indexes into regions, the stable phases at grid point i.
+    """
+    
+    terminals: List[str]
+    resolution: int
+    values: List[float]
+    facets: List[int]
+    regions: List[List[str]]
+    metadata: DiagramMetadata
+
+
+class ChemicalPotentialDomain(BaseModel):
+    """Chemical potentials at which one phase is stable."""
+    
+    formula: str
+    entry_id: str
+    vertices: List[List[float]]
+
+
+class ChemicalPotentialResponse(BaseModel):
+    """
+    Chemical potential diagram of the chemical system of the formulas.
+    
+    Potentials are formal (relative to the elemental references, eV/atom),
+    with coordinates in the order of elements, and bounded below by
+    min_potential. Each domain is a facet of the diagram: a segment for two
+    elements, a polygon with vertices in boundary order for three, and the
+    vertices of a polytope for more.
+    """
+    
+    elements: List[str]
+    min_potential: float
+    domains: List[ChemicalPotentialDomain]
     metadata: DiagramMetadata
 
 
@@ -48,4 +174,20 @@ class HealthResponse(BaseModel):
     status: str
     app_name: str
     version: str
-    timestamp: str
\ No newline at end of file
+    timestamp: str
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness of the instance to take diagram jobs."""
+    
+    status: str
+    in_flight: int
+    queued: int
+    max_concurrent: int
+    max_queue: int
+    active_keys: int
+    avg_job_seconds: float
+    cache_sizes: Dict[str, int]
+    mp_circuit_open: bool
+    mp_clients: int
+    timestamp: str
@@ -0,0 +1,229 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from ..core.config import settings
+from ..core.logging import get_logger
+from .deadline import Deadline, RequestCancelled
+
+logger = get_logger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """The server is at capacity and the request was shed."""
+
+    def __init__(self, message: str, retry_after: int = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def job_cost(num_components: int) -> float:
+    """Relative cost of a diagram job: 1 for binaries, doubling per extra component."""
+    return float(2 ** max(0, num_components - 2))
+
+
+class _Waiter:
+    """A queued job waiting to be granted a slot."""
+
+    __slots__ = ("key", "cost", "granted")
+
+    def __init__(self, key: str, cost: float):
+        self.key = key
+        self.cost = cost
+        self.granted = False
+
+
+class AdmissionController:
+    """
+    Global concurrency limit for CPU-heavy jobs with fair, bounded wait queues.
+
+    At most max_concurrent jobs run at once, and at most max_per_key of them
+    for the same key (API key hash). Waiting jobs are queued per key and
+    granted slots by deficit round-robin on their cost, so a key submitting
+    expensive quaternary systems cannot starve keys with small requests.
+    A job arriving when the global queue or its key's queue is full, or
+    waiting longer than queue_timeout, is rejected at once instead of
+    competing for CPU. A queued job whose request deadline is cancelled or
+    expires leaves the queue at once. Retry-After hints come from a moving
+    average of recent job durations.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = None,
+        max_queue: int = None,
+        queue_timeout: float = None,
+        max_per_key: int = None,
+        max_queued_per_key: int = None,
+        quantum: float = 1.0
+    ):
+        self.max_concurrent = max_concurrent or settings.max_concurrent_jobs
+        self.max_queue = max_queue if max_queue is not None else settings.max_queued_jobs
+        self.queue_timeout = queue_timeout or settings.queue_timeout
+        self.max_per_key = max_per_key or settings.max_jobs_per_key
+        self.max_queued_per_key = max_queued_per_key or settings.max_queued_per_key
+        self.quantum = quantum
+        self._in_flight = 0
+        self._queued = 0
+        self._running: Dict[str, int] = {}
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._deficits: Dict[str, float] = {}
+        self._avg_seconds = 1.0
+        self._cond = threading.Condition()
+
+    def run(
+        self,
+        func: Callable[..., Any],
+        *args,
+        key: str = "",
+        cost: float = 1.0,
+        deadline: Optional[Deadline] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Run func once the scheduler grants a slot, blocking the calling thread while queued.
+
+        Args:
+            func: Job to run with the remaining arguments
+            key: Fairness key, normally the API key hash
+            cost: Relative cost of the job (see job_cost)
+            deadline: Request deadline, checked while queued and passed on to
+                func as its deadline argument
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out
+            RequestCancelled: If the deadline is cancelled or expires while queued
+        """
+        if deadline is not None:
+            kwargs["deadline"] = deadline
+        self._acquire(key, cost, deadline)
+        start = time.time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._release(key, time.time() - start)
+
+    def _acquire(self, key: str, cost: float, request_deadline: Optional[Deadline] = None):
+        with self._cond:
+            waiter = _Waiter(key, cost)
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = deque()
+                self._deficits[key] = 0.0
+            queue.append(waiter)
+            self._queued += 1
+            self._dispatch()
+
+            if not waiter.granted and (
+                self._queued > self.max_queue or len(queue) > self.max_queued_per_key
+            ):
+                self._withdraw(waiter)
+                logger.warning(f"Shedding request for key {key[:8]}: "
+                               f"{self._in_flight} running, {self._queued} queued")
+                raise AdmissionRejected(
+                    "Server is busy, please retry shortly",
+                    retry_after=self._retry_after()
+                )
+
+            deadline = time.monotonic() + self.queue_timeout
+            while not waiter.granted:
+                if request_deadline is not None:
+                    # Dead requests give up their place instead of waiting for a slot
+                    try:
+                        request_deadline.check("admission")
+                    except RequestCancelled:
+                        self._withdraw(waiter)
+                        raise
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._withdraw(waiter)
+                    raise AdmissionRejected(
+                        "Timed out waiting for server capacity, please retry shortly",
+                        retry_after=self._retry_after()
+                    )
+                if request_deadline is not None:
+                    # Cancellation does not notify the condition, so poll for it
+                    remaining = min(remaining, settings.disconnect_poll_interval)
+                self._cond.wait(remaining)
+
+    def _release(self, key: str, elapsed: float):
+        with self._cond:
+            self._in_flight -= 1
+            self._running[key] -= 1
+            if not self._running[key]:
+                del self._running[key]
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+            self._dispatch()
+
+    def _dispatch(self):
+        """Grant free slots to waiting jobs (caller holds the lock)."""
+        granted = False
+        while self._in_flight < self.max_concurrent:
+            waiter = self._next_waiter()
+            if waiter is None:
+                break
+            waiter.granted = True
+            self._queued -= 1
+            self._in_flight += 1
+            self._running[waiter.key] = self._running.get(waiter.key, 0) + 1
+            granted = True
+
+        if granted:
+            self._cond.notify_all()
+
+    def _next_waiter(self):
+        """Deficit round-robin over keys that are below their concurrency cap."""
+        eligible = [key for key in self._queues if self._running.get(key, 0) < self.max_per_key]
+        if not eligible:
+            return None
+
+        while True:
+            key = next(key for key in self._queues if key in eligible)
+            queue = self._queues[key]
+            if self._deficits[key] >= queue[0].cost:
+                waiter = queue.popleft()
+                self._deficits[key] -= waiter.cost
+                if not queue:
+                    del self._queues[key]
+                    del self._deficits[key]
+                return waiter
+
+            # Not enough credit: top up and move to the back of the round
+            self._deficits[key] += self.quantum
+            self._queues.move_to_end(key)
+
+    def _withdraw(self, waiter: _Waiter):
+        """Remove a waiter that gave up from its queue (caller holds the lock)."""
+        queue = self._queues[waiter.key]
+        queue.remove(waiter)
+        self._queued -= 1
+        if not queue:
+            del self._queues[waiter.key]
+            del self._deficits[waiter.key]
+
+    def _retry_after(self) -> int:
+        """Estimated seconds until the current queue has drained."""
+        return max(1, math.ceil(self._avg_seconds * (self._queued + 1) / self.max_concurrent))
+
+    @property
+    def saturated(self) -> bool:
+        """True when new jobs would be rejected."""
+        return self._queued >= self.max_queue
+
+    def stats(self) -> Dict[str, Any]:
+        """Running and queued jobs, limits and average job duration."""
+        with self._cond:
+            return {
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "active_keys": len(set(self._running) | set(self._queues)),
+                "avg_job_seconds": round(self._avg_seconds, 3)
+            }
+
+
+# Global admission controller for diagram generation
+admission = AdmissionController()
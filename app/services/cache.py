@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Tuple
+
+from ..core.config import settings
+from ..core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose items expire after a fixed time-to-live.
+    
+    With stale_seconds > 0, expired items are kept for that much longer and
+    returned by lookup() flagged as stale, so callers can serve them while
+    refreshing in the background.
+    """
+
+    def __init__(
+        self,
+        max_size: int = None,
+        ttl_seconds: int = None,
+        name: str = "cache",
+        stale_seconds: int = 0
+    ):
+        self.max_size = max_size or settings.cache_max_size
+        self.ttl_seconds = ttl_seconds or settings.cache_ttl
+        self.stale_seconds = stale_seconds
+        self.name = name
+        self._items: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a cached value, refreshing its LRU position.
+
+        Args:
+            key: Cache key
+            default: Value returned on a miss or an expired item
+
+        Returns:
+            Cached value or default
+        """
+        value, stale = self.lookup(key)
+        if value is None or stale:
+            return default
+        return value
+
+    def lookup(self, key: Hashable) -> Tuple[Any, bool]:
+        """
+        Get a cached value that may be past its time-to-live.
+
+        Returns:
+            Tuple of (value, is_stale); (None, False) on a miss
+        """
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None, False
+
+            value, stored_at = item
+            age = time.time() - stored_at
+            if age > self.ttl_seconds + self.stale_seconds:
+                del self._items[key]
+                return None, False
+
+            self._items.move_to_end(key)
+            return value, age > self.ttl_seconds
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used item if full."""
+        with self._lock:
+            self._items[key] = (value, time.time())
+            self._items.move_to_end(key)
+
+            while len(self._items) > self.max_size:
+                evicted_key, _ = self._items.popitem(last=False)
+                logger.debug(f"{self.name}: evicted {evicted_key}")
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Get a cached value or build and store it with factory().
+
+        The factory runs outside the lock, so concurrent misses on the same
+        key may both build the value; the last one wins.
+        """
+        value = self.get(key)
+        if value is not None:
+            logger.debug(f"{self.name}: hit for {key}")
+            return value
+
+        logger.debug(f"{self.name}: miss for {key}")
+        value = factory()
+        self.set(key, value)
+        return value
+
+    def clear(self):
+        """Remove all items."""
+        with self._lock:
+            self._items.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# Global cache instances
+entry_cache = TTLCache(name="entry_cache", stale_seconds=settings.cache_stale_ttl)
+diagram_cache = TTLCache(name="diagram_cache")
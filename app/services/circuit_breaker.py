@@ -0,0 +1,114 @@
+import threading
+import time
+from typing import Optional
+
+from ..core.config import settings
+from ..core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class Permit:
+    """Leave to make one upstream call, stamped with the breaker state it was issued in."""
+
+    __slots__ = ("generation",)
+
+    def __init__(self, generation: int):
+        self.generation = generation
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one upstream service.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are refused for reset_seconds. The first call after that is let through as
+    a trial: success closes the circuit, failure opens it again. allow()
+    returns a permit that the caller passes back with its result. Results of
+    calls permitted before the circuit last opened or closed are ignored, and
+    only the trial call's permit can close the circuit or free the trial slot.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = None,
+        reset_seconds: float = None
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.mp_breaker_failures
+        self.reset_seconds = reset_seconds or settings.mp_breaker_reset
+        self._failures = 0
+        self._opened_at = None
+        self._trial = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> Optional[Permit]:
+        """
+        Check whether a call to the upstream may be made now.
+
+        Returns:
+            A permit if the circuit is closed, or open long enough for a trial
+            call; None if the call is refused
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return Permit(self._generation)
+            if self._trial is not None or time.time() - self._opened_at < self.reset_seconds:
+                return None
+            self._trial = Permit(self._generation)
+            logger.info(f"{self.name}: circuit half-open, allowing trial call")
+            return self._trial
+
+    def record_success(self, permit: Permit):
+        """Close the circuit after a successful call."""
+        with self._lock:
+            if self._is_stale(permit):
+                return
+            if self._opened_at is not None:
+                logger.info(f"{self.name}: circuit closed")
+                self._generation += 1
+            self._failures = 0
+            self._opened_at = None
+            self._trial = None
+
+    def record_failure(self, permit: Permit):
+        """Count a failed call, opening the circuit at the threshold."""
+        with self._lock:
+            if self._is_stale(permit):
+                return
+            self._failures += 1
+            self._trial = None
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"{self.name}: circuit opened after {self._failures} failures")
+                self._opened_at = time.time()
+                self._generation += 1
+
+    def abandon(self, permit: Optional[Permit]):
+        """Give up a call without a verdict, freeing the trial slot if its permit owns it."""
+        with self._lock:
+            if permit is not None and permit is self._trial:
+                self._trial = None
+
+    def retry_after(self) -> int:
+        """Seconds until a trial call will be allowed (0 if closed)."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            return max(0, int(self._opened_at + self.reset_seconds - time.time()) + 1)
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def _is_stale(self, permit: Permit) -> bool:
+        # While open only the trial's result counts; while closed, only permits issued since it closed
+        if self._opened_at is not None:
+            return permit is not self._trial
+        return permit.generation != self._generation
+
+
+# Global breaker for the Materials Project API
+mp_breaker = CircuitBreaker("materials_project")
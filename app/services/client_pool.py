@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+from mp_api.client import MPRester
+
+from ..core.config import settings
+from ..core.logging import get_logger
+from ..core.security import hash_api_key
+
+logger = get_logger(__name__)
+
+
+class PoolSaturated(Exception):
+    """An API key already has its maximum of concurrent upstream requests in flight."""
+
+    def __init__(self, message: str, retry_after: int = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _PooledClient:
+    """A long-lived MPRester with its per-key concurrency limit."""
+
+    __slots__ = ("rester", "semaphore", "in_use", "last_used")
+
+    def __init__(self, rester: Any, max_concurrent: int):
+        self.rester = rester
+        self.semaphore = threading.BoundedSemaphore(max_concurrent)
+        self.in_use = 0
+        self.last_used = time.time()
+
+
+class ClientPool:
+    """
+    Bounded pool of long-lived Materials Project clients keyed by API key hash.
+
+    Reusing an MPRester keeps its HTTP session (and keep-alive connections)
+    open and skips the heartbeat/version calls made on construction. Clients
+    idle for longer than idle_seconds are closed, the least recently used idle
+    client is evicted when the pool is full, and each key may run at most
+    max_concurrent upstream requests at once.
+    """
+
+    def __init__(
+        self,
+        max_clients: int = None,
+        idle_seconds: int = None,
+        max_concurrent: int = None,
+        acquire_timeout: float = None,
+        factory: Callable[[str], Any] = None
+    ):
+        self.max_clients = max_clients or settings.mp_pool_max_clients
+        self.idle_seconds = idle_seconds or settings.mp_pool_idle_seconds
+        self.max_concurrent = max_concurrent or settings.mp_max_concurrent_per_key
+        self.acquire_timeout = acquire_timeout or settings.mp_acquire_timeout
+        self._factory = factory or (lambda api_key: MPRester(api_key=api_key))
+        self._clients: "OrderedDict[str, _PooledClient]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def session(self, api_key: str) -> Iterator[Any]:
+        """
+        Borrow the pooled client for an API key.
+
+        Raises:
+            PoolSaturated: If the key already has max_concurrent requests in
+                flight for longer than acquire_timeout
+        """
+        slot = self._checkout(api_key)
+        if not slot.semaphore.acquire(timeout=self.acquire_timeout):
+            self._checkin(slot)
+            raise PoolSaturated(
+                "Too many concurrent Materials Project requests for this API key",
+                retry_after=max(1, int(self.acquire_timeout))
+            )
+
+        try:
+            yield slot.rester
+        finally:
+            slot.semaphore.release()
+            self._checkin(slot)
+
+    def _checkout(self, api_key: str) -> _PooledClient:
+        key = hash_api_key(api_key)
+        with self._lock:
+            self._evict_idle()
+            slot = self._clients.get(key)
+            if slot is not None:
+                self._clients.move_to_end(key)
+                slot.in_use += 1
+                return slot
+
+        # Construct outside the lock: MPRester makes network calls on init
+        logger.info(f"Creating pooled Materials Project client for key: {key[:8]}...")
+        rester = self._factory(api_key)
+        _count_received_bytes(rester)
+        new_slot = _PooledClient(rester, self.max_concurrent)
+
+        with self._lock:
+            slot = self._clients.get(key)
+            if slot is None:
+                slot = self._clients[key] = new_slot
+            else:
+                # Another request created one meanwhile
+                self._close(new_slot)
+            self._clients.move_to_end(key)
+            slot.in_use += 1
+            self._evict_overflow()
+            return slot
+
+    def _checkin(self, slot: _PooledClient):
+        with self._lock:
+            slot.in_use -= 1
+            slot.last_used = time.time()
+
+    def _evict_idle(self):
+        now = time.time()
+        expired = [
+            key for key, slot in self._clients.items()
+            if slot.in_use == 0 and now - slot.last_used > self.idle_seconds
+        ]
+        for key in expired:
+            self._close(self._clients.pop(key))
+
+        if expired:
+            logger.debug(f"Closed {len(expired)} idle Materials Project clients")
+
+    def _evict_overflow(self):
+        for key in list(self._clients):
+            if len(self._clients) <= self.max_clients:
+                break
+            if self._clients[key].in_use == 0:
+                self._close(self._clients.pop(key))
+
+    @staticmethod
+    def _close(slot: _PooledClient):
+        try:
+            slot.rester.__exit__(None, None, None)
+        except Exception as e:
+            logger.warning(f"Error closing Materials Project client: {e}")
+
+    def close_all(self):
+        """Close every pooled client."""
+        with self._lock:
+            for slot in self._clients.values():
+                self._close(slot)
+            self._clients.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Pool size and number of clients currently in use."""
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "in_use": sum(1 for slot in self._clients.values() if slot.in_use)
+            }
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+_received = threading.local()
+
+
+def received_bytes() -> int:
+    """Response bytes received so far by pooled clients on the calling thread."""
+    return getattr(_received, "total", 0)
+
+
+def _count_received_bytes(rester: Any):
+    """
+    Count response bytes on the client's HTTP session per thread.
+    
+    A pooled client is shared by concurrent requests, so a single total on
+    the session would mix their traffic; each thread keeps its own total,
+    read with received_bytes().
+    """
+    session = getattr(rester, "session", None)
+    hooks = getattr(session, "hooks", None)
+    if not isinstance(hooks, dict):
+        return
+
+    def count(response, *args, **kwargs):
+        _received.total = received_bytes() + len(response.content or b"")
+
+    hooks.setdefault("response", []).append(count)
+
+
+# Global client pool instance
+client_pool = ClientPool()
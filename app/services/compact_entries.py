@@ -0,0 +1,82 @@
+import sys
+from typing import List, Optional, Sequence
+
+import numpy as np
+from pymatgen.core.composition import Composition
+from pymatgen.entries.computed_entries import ComputedEntry
+
+
+class CompactEntrySet:
+    """
+    Array-backed storage for the entry fields used after hull construction.
+
+    Materials Project entries carry structures, parameters and data dicts
+    that the phase diagram pipeline never reads. This keeps only composition
+    vectors, uncorrected energies, corrections and entry IDs, and rebuilds
+    plain ComputedEntry objects on demand with identical energies.
+    """
+
+    __slots__ = ("elements", "amounts", "uncorrected_energies", "corrections", "entry_ids")
+
+    def __init__(
+        self,
+        elements: Sequence[str],
+        amounts: np.ndarray,
+        uncorrected_energies: np.ndarray,
+        corrections: np.ndarray,
+        entry_ids: Sequence[Optional[str]]
+    ):
+        self.elements = tuple(elements)
+        self.amounts = amounts
+        self.uncorrected_energies = uncorrected_energies
+        self.corrections = corrections
+        self.entry_ids = tuple(entry_ids)
+
+    @classmethod
+    def from_entries(cls, entries: Sequence[ComputedEntry]) -> "CompactEntrySet":
+        """Pack entries into arrays."""
+        elements = sorted({el.symbol for entry in entries for el in entry.composition})
+        column = {el: idx for idx, el in enumerate(elements)}
+
+        amounts = np.zeros((len(entries), len(elements)))
+        for row, entry in enumerate(entries):
+            for el, amount in entry.composition.items():
+                amounts[row, column[el.symbol]] = amount
+
+        return cls(
+            elements=elements,
+            amounts=amounts,
+            uncorrected_energies=np.array([e.uncorrected_energy for e in entries], dtype=float),
+            corrections=np.array([e.correction for e in entries], dtype=float),
+            entry_ids=[e.entry_id for e in entries]
+        )
+
+    def to_entries(self) -> List[ComputedEntry]:
+        """Rebuild lightweight ComputedEntry objects."""
+        entries = []
+        for amounts, energy, correction, entry_id in zip(
+            self.amounts, self.uncorrected_energies, self.corrections, self.entry_ids
+        ):
+            composition = Composition({
+                el: float(amount) for el, amount in zip(self.elements, amounts) if amount
+            })
+            entries.append(ComputedEntry(
+                composition,
+                float(energy),
+                correction=float(correction),
+                entry_id=entry_id
+            ))
+        return entries
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory footprint in bytes."""
+        return (
+            self.amounts.nbytes
+            + self.uncorrected_energies.nbytes
+            + self.corrections.nbytes
+            + sum(sys.getsizeof(entry_id) for entry_id in self.entry_ids)
+        )
+
+    def __len__(self) -> int:
+        return len(self.entry_ids)
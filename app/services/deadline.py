@@ -0,0 +1,62 @@
+import threading
+import time
+
+from ..core.config import settings
+from ..core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class RequestCancelled(Exception):
+    """The request was abandoned: its client went away or its time budget ran out."""
+
+    def __init__(self, message: str, timed_out: bool = False):
+        super().__init__(message)
+        self.timed_out = timed_out
+
+
+class Deadline:
+    """
+    Time budget and cancellation flag for one request.
+
+    Long-running work calls check() between stages (fetch, hull, plot) and
+    stops with RequestCancelled once the budget is spent or cancel() has been
+    called, e.g. because the client disconnected. A stage that has already
+    started runs to completion; only the remaining stages are skipped.
+    """
+
+    def __init__(self, seconds: float = None):
+        self.seconds = seconds or settings.request_timeout
+        self.expires_at = time.monotonic() + self.seconds
+        self._cancelled = threading.Event()
+        self._reason = None
+
+    def cancel(self, reason: str):
+        """Abandon the request at the next check."""
+        self._reason = reason
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def remaining(self) -> float:
+        """Seconds left in the budget (never negative)."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def check(self, stage: str):
+        """
+        Raise if the request should stop before the given stage.
+
+        Raises:
+            RequestCancelled: If cancelled or past the deadline
+        """
+        if self._cancelled.is_set():
+            logger.info(f"Abandoning request before {stage}: {self._reason}")
+            raise RequestCancelled(f"Request cancelled: {self._reason}")
+        if time.monotonic() >= self.expires_at:
+            logger.warning(f"Abandoning request before {stage}: exceeded {self.seconds:.0f}s budget")
+            raise RequestCancelled(
+                f"Request exceeded its time budget of {self.seconds:.0f} seconds",
+                timed_out=True
+            )
@@ -0,0 +1,92 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from pymatgen.entries import Entry
+
+from ..core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def prune_entries(
+    entries: Sequence[Entry],
+    energy_cutoff: float,
+    margin: float
+) -> Tuple[List[Entry], int]:
+    """
+    Drop polymorphs that can never be shown within the energy cutoff.
+
+    For each reduced composition the lowest-energy entry is kept, together
+    with every entry within energy_cutoff + margin eV/atom of it. Since the
+    hull at a composition is never above its lowest polymorph, any dropped
+    entry is more than energy_cutoff above the hull, so the hull and every
+    entry displayed with show_unstable=energy_cutoff are unchanged.
+
+    Args:
+        entries: Entries as returned by the Materials Project
+        energy_cutoff: Energy cutoff for unstable phases in eV/atom
+        margin: Safety margin added to the cutoff in eV/atom
+
+    Returns:
+        Tuple of (kept entries in input order, number of dropped entries)
+    """
+    lowest: Dict[str, float] = {}
+    for entry in entries:
+        formula = entry.composition.reduced_formula
+        energy = entry.energy_per_atom
+        if formula not in lowest or energy < lowest[formula]:
+            lowest[formula] = energy
+
+    threshold = energy_cutoff + margin
+    kept = [
+        entry for entry in entries
+        if entry.energy_per_atom - lowest[entry.composition.reduced_formula] <= threshold
+    ]
+    dropped = len(entries) - len(kept)
+
+    logger.info(f"Pruned {dropped} of {len(entries)} entries (cutoff {energy_cutoff} + {margin} eV/atom)")
+
+    return kept, dropped
+
+
+def prune_above_terminals(
+    entries: Sequence[Entry],
+    weights: np.ndarray,
+    energy_cutoff: float,
+    margin: float
+) -> Tuple[List[Entry], int]:
+    """
+    Drop entries too far above the plane through the terminals.
+
+    Within the terminal simplex the hull never rises above the plane through
+    the lowest entry of each terminal, so an entry more than energy_cutoff +
+    margin eV/atom above that plane is at least as far above the hull. Unlike
+    prune_entries this also removes compositions whose every polymorph is
+    dominated, which keeps the entry count of high-dimensional systems down.
+
+    Args:
+        entries: Entries inside the terminal simplex
+        weights: Atomic-fraction amount of each terminal per entry,
+            shape (n_entries, n_terminals)
+        energy_cutoff: Energy cutoff for unstable phases in eV/atom
+        margin: Safety margin added to the cutoff in eV/atom
+
+    Returns:
+        Tuple of (kept entries in input order, number of dropped entries).
+        Nothing is dropped if a terminal has no entry.
+    """
+    energies = np.array([entry.energy_per_atom for entry in entries], dtype=float)
+    is_terminal = np.isclose(weights, 1.0, atol=1e-6)
+    if len(entries) == 0 or not is_terminal.any(axis=0).all():
+        return list(entries), 0
+
+    terminal_energies = np.array([
+        energies[is_terminal[:, idx]].min() for idx in range(weights.shape[1])
+    ])
+    keep = energies - weights @ terminal_energies <= energy_cutoff + margin
+    kept = [entry for entry, k in zip(entries, keep) if k]
+    dropped = len(entries) - len(kept)
+
+    logger.info(f"Pruned {dropped} of {len(entries)} entries above the terminal plane")
+
+    return kept, dropped
@@ -0,0 +1,178 @@
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from ..core.logging import get_logger
+from ..models.requests import DiagramRequest
+from .admission import AdmissionRejected, admission, job_cost
+from .client_pool import PoolSaturated
+from .deadline import Deadline, RequestCancelled
+from .materials_client import MaterialsProjectUnavailable
+from .phase_analyzer import PhaseAnalyzer
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+logger = get_logger(__name__)
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# Column name and Arrow type name, in output order
+COLUMNS = [
+    ("request_index", "int64"),
+    ("system", "string"),
+    ("temperature", "int64"),
+    ("functional", "string"),
+    ("e_cut", "float64"),
+    ("formula", "string"),
+    ("composition", "string"),
+    ("energy_per_atom", "float64"),
+    ("total_energy", "float64"),
+    ("formation_energy_per_atom", "float64"),
+    ("correction", "float64"),
+    ("entry_id", "string"),
+    ("num_atoms", "float64"),
+    ("error", "string"),
+]
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+
+
+def arrow_available() -> bool:
+    """Whether the optional pyarrow dependency is installed."""
+    return pa is not None
+
+
+def phase_table_batches(
+    phase_analyzer: PhaseAnalyzer,
+    requests: List[DiagramRequest],
+    key: str = "",
+    deadline: Optional[Deadline] = None
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Build the phase table of each request in turn.
+
+    Yields one list of rows per request as soon as its diagram is done. Each
+    diagram takes its own admission slot under the given fairness key. A
+    request that fails yields a single row carrying the error message, so one
+    bad system does not abort the rest of the export. Once the deadline runs
+    out the remaining systems fail the same way; if it is cancelled the
+    export stops.
+    """
+    for index, request in enumerate(requests):
+        base = {
+            "request_index": index,
+            "system": "-".join(request.formulas),
+            "temperature": request.temperature,
+            "functional": request.functional,
+            "e_cut": request.energy_cutoff,
+        }
+        try:
+            data = admission.run(
+                phase_analyzer.get_phase_data,
+                key=key,
+                cost=job_cost(len(request.formulas)),
+                formulas=request.formulas,
+                temperature=request.temperature,
+                energy_cutoff=request.energy_cutoff,
+                functional=request.functional,
+                custom_entries=request.custom_computed_entries(),
+                deadline=deadline
+            )
+        except RequestCancelled as e:
+            if not e.timed_out:
+                raise
+            logger.warning(f"Export of {base['system']} failed: {e}")
+            yield [_row(base, error=str(e))]
+            continue
+        except (ValueError, MaterialsProjectUnavailable, AdmissionRejected, PoolSaturated) as e:
+            logger.warning(f"Export of {base['system']} failed: {e}")
+            yield [_row(base, error=str(e))]
+            continue
+        except Exception as e:
+            logger.error(f"Export of {base['system']} failed: {e}", exc_info=True)
+            yield [_row(base, error="Internal server error occurred while generating phase diagram")]
+            continue
+
+        yield [
+            _row(base, **phase.dict(exclude={"temperature"}))
+            for phase in data.phase_info
+        ]
+
+
+def stream_phase_tables(
+    phase_analyzer: PhaseAnalyzer,
+    requests: List[DiagramRequest],
+    fmt: str,
+    key: str = "",
+    deadline: Optional[Deadline] = None
+) -> Iterator[bytes]:
+    """
+    Stream phase tables for many diagrams as CSV, NDJSON or Arrow IPC.
+
+    Rows are encoded and yielded after each diagram, so memory use does not
+    grow with the number of exported systems.
+
+    Args:
+        phase_analyzer: Analyzer used to build each diagram
+        requests: Diagram requests to export, in order
+        fmt: One of "csv", "ndjson" or "arrow"
+        key: Fairness key for admission, normally the API key hash
+        deadline: Budget and cancellation flag shared by the whole export
+
+    Returns:
+        Iterator of encoded chunks
+    """
+    encoders = {"csv": _encode_csv, "ndjson": _encode_ndjson, "arrow": _encode_arrow}
+    batches = phase_table_batches(phase_analyzer, requests, key, deadline)
+    for chunk in encoders[fmt](batches):
+        if chunk:
+            yield chunk
+
+
+def _row(base: Dict[str, Any], **values) -> Dict[str, Any]:
+    row = dict.fromkeys(COLUMN_NAMES)
+    row.update(base)
+    row.update(values)
+    return row
+
+
+def _encode_csv(batches: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMN_NAMES)
+    writer.writeheader()
+    for rows in batches:
+        writer.writerows(rows)
+        yield _drain(buffer).encode()
+    yield _drain(buffer).encode()
+
+
+def _encode_ndjson(batches: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for rows in batches:
+        yield "".join(json.dumps(row) + "\n" for row in rows).encode()
+
+
+def _encode_arrow(batches: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    schema = pa.schema([(name, getattr(pa, type_name)()) for name, type_name in COLUMNS])
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield _drain(sink)
+        for rows in batches:
+            writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=schema))
+            yield _drain(sink)
+    # End-of-stream marker
+    yield _drain(sink)
+
+
+def _drain(buffer):
+    """Return and clear the contents of an in-memory buffer."""
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
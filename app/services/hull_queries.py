@@ -0,0 +1,174 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from pymatgen.analysis.phase_diagram import PhaseDiagram
+from pymatgen.core.composition import Composition
+from pymatgen.entries import Entry
+
+from ..core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Upper bound on points x facets evaluated in one NumPy pass
+_CHUNK_ELEMENTS = 2_000_000
+
+
+def composition_matrix(compositions: Sequence[Composition], elements: Sequence) -> np.ndarray:
+    """Atomic fractions of compositions as an (n_compositions, n_elements) array."""
+    rows = [[comp.get_atomic_fraction(el) for el in elements] for comp in compositions]
+    return np.asarray(rows, dtype=float).reshape(len(rows), len(elements))
+
+
+def terminal_weights(fractions: np.ndarray, terminal_fractions: np.ndarray) -> np.ndarray:
+    """
+    Atomic-fraction amounts of the terminals in each composition.
+
+    Args:
+        fractions: Atomic fractions, shape (n_compositions, n_elements)
+        terminal_fractions: Atomic fractions of the terminals, shape (n_terminals, n_elements)
+
+    Returns:
+        Least-squares weights, shape (n_compositions, n_terminals)
+    """
+    return np.linalg.lstsq(terminal_fractions.T, fractions.T, rcond=None)[0].T
+
+
+def in_terminal_space(
+    fractions: np.ndarray,
+    terminal_fractions: np.ndarray,
+    tol: float = 1e-4
+) -> np.ndarray:
+    """
+    Mask of compositions that are non-negative mixtures of the terminals.
+
+    Solves all compositions against the terminal basis in one least-squares
+    call. The tolerance is deliberately loose so the mask is a superset of
+    what CompoundPhaseDiagram accepts; its exact reaction check still applies.
+
+    Args:
+        fractions: Atomic fractions, shape (n_compositions, n_elements)
+        terminal_fractions: Atomic fractions of the terminals, shape (n_terminals, n_elements)
+        tol: Most negative terminal amount still accepted
+    """
+    weights = terminal_weights(fractions, terminal_fractions)
+    residual = np.abs(weights @ terminal_fractions - fractions).max(axis=1)
+    return (residual < 1e-6) & (weights.min(axis=1) > -tol)
+
+
+def simplex_grid(n_components: int, resolution: int) -> np.ndarray:
+    """
+    Integer lattice points covering a composition simplex.
+
+    Args:
+        n_components: Number of terminals
+        resolution: Number of divisions along each edge
+    
+    Returns:
+        Array of shape (n_points, n_components) of non-negative integers that sum
+        to resolution, in lexicographic order of the first n_components - 1 columns
+    """
+    axes = np.indices((resolution + 1,) * (n_components - 1)).reshape(n_components - 1, -1).T
+    axes = axes[axes.sum(axis=1) <= resolution]
+    return np.column_stack([axes, resolution - axes.sum(axis=1)])
+
+
+class HullQuery:
+    """
+    Vectorized point queries against the facets of a built phase diagram.
+
+    Barycentric coordinates of every query point in every hull facet are
+    computed in batched NumPy operations instead of pymatgen's one-point,
+    one-facet-at-a-time loop. Works for PhaseDiagram and CompoundPhaseDiagram.
+    """
+
+    def __init__(self, phase_diagram: PhaseDiagram):
+        self.phase_diagram = phase_diagram
+        self.elements = list(phase_diagram.elements)
+        self.tol = PhaseDiagram.numerical_tol / 10
+
+        facets = np.asarray(phase_diagram.facets, dtype=int).reshape(len(phase_diagram.facets), -1)
+        vertices = phase_diagram.qhull_data[facets, :-1]
+
+        self.facets = facets
+        self.vertex_energies = phase_diagram.qhull_data[facets, -1]
+        self._origins = vertices[:, -1, :]
+        edges = vertices[:, :-1, :] - self._origins[:, None, :]
+        self._inverses = np.linalg.inv(np.transpose(edges, (0, 2, 1)))
+        self._ref_energies = np.array([
+            phase_diagram.el_refs[el].energy_per_atom for el in self.elements
+        ])
+
+    def fractions(self, compositions: Sequence[Composition]) -> np.ndarray:
+        """
+        Atomic fractions of compositions in the phase diagram's element order.
+
+        Raises:
+            ValueError: If a composition contains elements outside the diagram
+        """
+        allowed = set(self.elements)
+        for comp in compositions:
+            if set(comp.elements) - allowed:
+                raise ValueError(
+                    f"{comp.reduced_formula} has elements outside the phase diagram "
+                    f"({', '.join(str(el) for el in self.elements)})"
+                )
+        return composition_matrix(compositions, self.elements)
+
+    def locate(self, fractions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the hull facet containing each point.
+
+        Args:
+            fractions: Array of shape (n_points, n_elements) of atomic fractions
+
+        Returns:
+            Tuple of (facet index per point, barycentric coordinates per point).
+            Points outside every facet get index -1 and NaN coordinates.
+        """
+        coords = np.asarray(fractions, dtype=float)[:, 1:]
+        n_points, n_facets = len(coords), len(self.facets)
+        facet_idx = np.full(n_points, -1, dtype=int)
+        bary = np.full((n_points, self.facets.shape[1]), np.nan)
+
+        chunk = max(1, _CHUNK_ELEMENTS // max(1, n_facets * self.facets.shape[1]))
+        for start in range(0, n_points, chunk):
+            block = coords[start:start + chunk]
+            rel = block[:, None, :] - self._origins[None, :, :]
+            lam = np.einsum("fij,nfj->nfi", self._inverses, rel)
+            lam = np.concatenate([lam, 1 - lam.sum(axis=2, keepdims=True)], axis=2)
+
+            inside = lam.min(axis=2) >= -self.tol
+            found = inside.any(axis=1)
+            first = inside.argmax(axis=1)
+
+            rows = np.nonzero(found)[0]
+            facet_idx[start + rows] = first[rows]
+            bary[start + rows] = lam[rows, first[rows]]
+
+        return facet_idx, bary
+
+    def hull_energies(self, facet_idx: np.ndarray, bary: np.ndarray) -> np.ndarray:
+        """Hull energy per atom at located points (NaN where not located)."""
+        energies = np.full(len(facet_idx), np.nan)
+        found = facet_idx >= 0
+        energies[found] = (bary[found] * self.vertex_energies[facet_idx[found]]).sum(axis=1)
+        return energies
+
+    def reference_energies(self, fractions: np.ndarray) -> np.ndarray:
+        """Energy per atom of the unreacted elemental references at each point."""
+        return np.asarray(fractions, dtype=float) @ self._ref_energies
+
+    def decompositions(self, facet_idx: np.ndarray, bary: np.ndarray) -> List[Dict[Entry, float]]:
+        """Decomposition of each located point as {entry: fraction}."""
+        qhull_entries = self.phase_diagram.qhull_entries
+        result = []
+        for idx, amounts in zip(facet_idx, bary):
+            if idx < 0:
+                result.append({})
+                continue
+            result.append({
+                qhull_entries[vertex]: float(amount)
+                for vertex, amount in zip(self.facets[idx], amounts)
+                if abs(amount) > PhaseDiagram.numerical_tol
+            })
+        return result
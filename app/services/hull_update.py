@@ -0,0 +1,103 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from pymatgen.analysis.phase_diagram import CompoundPhaseDiagram, PhaseDiagram
+from pymatgen.entries import Entry
+
+from ..core.logging import get_logger
+from .hull_queries import HullQuery
+
+logger = get_logger(__name__)
+
+
+class MergedPhaseDiagram(CompoundPhaseDiagram):
+    """
+    A compound phase diagram with extra entries, whose hull is built from a subset.
+
+    The hull is computed with the PhaseDiagram constructor from hull_entries
+    only; the entry lists are then those of the base diagram plus the added
+    entries, so every entry is reported and plotted as if the whole diagram
+    had been rebuilt.
+    """
+
+    def __init__(
+        self,
+        base: CompoundPhaseDiagram,
+        hull_entries: Sequence[Entry],
+        added_entries: Sequence[Entry],
+        added_transformed: Sequence[Entry]
+    ):
+        self.original_entries = list(base.original_entries) + list(added_entries)
+        self.terminal_compositions = base.terminal_compositions
+        self.normalize_terminals = base.normalize_terminals
+        self.species_mapping = base.species_mapping
+        PhaseDiagram.__init__(self, hull_entries, elements=base.elements)
+        self.entries = list(base.entries) + list(added_transformed)
+        self.all_entries = list(base.all_entries) + list(added_transformed)
+        self.computed_data = {**self.computed_data, "all_entries": self.all_entries}
+
+
+def add_entries(
+    phase_diagram: CompoundPhaseDiagram,
+    entries: Sequence[Entry],
+    skip_outside: bool = False
+) -> Tuple[CompoundPhaseDiagram, List[Entry]]:
+    """
+    Merge extra entries into a built compound phase diagram without rebuilding it.
+
+    The new entries are transformed into terminal space and located against
+    the existing facets in one vectorized pass. Entries on or above the hull
+    cannot change it; entries below it can only lower it, so every old entry
+    that was not a hull vertex stays off the new hull. The hull is therefore
+    recomputed from the old vertices plus the entries below it only, and the
+    full entry lists are merged in (see MergedPhaseDiagram), so the cost grows with the number of stable
+    phases rather than with all entries of the system.
+
+    Args:
+        phase_diagram: Cached diagram, which is left unchanged
+        entries: Entries to add, in the elemental composition space
+        skip_outside: Ignore entries outside the terminal compositions instead
+            of raising, e.g. when adding to a slice of a larger system
+
+    Returns:
+        Tuple of (new CompoundPhaseDiagram with all entries, the added entries
+        transformed into terminal space)
+
+    Raises:
+        ValueError: If an entry lies outside the terminal compositions
+    """
+    transformed, _ = phase_diagram.transform_entries(entries, phase_diagram.terminal_compositions)
+    inside = {id(t.original_entry) for t in transformed}
+    entries = [e for e in entries if id(e) in inside or not skip_outside]
+    if len(transformed) != len(entries):
+        outside = [e.composition.reduced_formula for e in entries if id(e) not in inside]
+        raise ValueError(f"Custom entries outside the terminal compositions: {', '.join(outside)}")
+    if not transformed:
+        return phase_diagram, []
+
+    query = HullQuery(phase_diagram)
+    facet_idx, bary = query.locate(query.fractions([t.composition for t in transformed]))
+    hull_energies = query.hull_energies(facet_idx, bary)
+    energies = np.array([t.energy_per_atom for t in transformed])
+    below = [t for t, e, hull_e in zip(transformed, energies, hull_energies) if e < hull_e - query.tol]
+
+    # Hull vertices and new points below the hull, lowest per composition
+    candidates: Dict = {}
+    for entry in list(phase_diagram.stable_entries) + below:
+        comp = entry.composition.reduced_composition
+        if comp not in candidates or entry.energy_per_atom < candidates[comp].energy_per_atom:
+            candidates[comp] = entry
+    merged = MergedPhaseDiagram(phase_diagram, list(candidates.values()), entries, transformed)
+
+    logger.info(f"Added {len(transformed)} entries to the hull ({len(below)} below it), "
+                f"rebuilt from {len(candidates)} of {len(merged.all_entries)} entries")
+
+    return merged, transformed
+
+
+def entries_above_hull(phase_diagram: PhaseDiagram, entries: Sequence[Entry]) -> List[float]:
+    """Energy above hull per atom of entries of the diagram, in one vectorized pass."""
+    query = HullQuery(phase_diagram)
+    facet_idx, bary = query.locate(query.fractions([e.composition for e in entries]))
+    hull_energies = query.hull_energies(facet_idx, bary)
+    return [max(0.0, e.energy_per_atom - hull_e) for e, hull_e in zip(entries, hull_energies)]
@@ -1,26 +1,70 @@
-from typing import List
-from mp_api.client import MPRester
+import itertools
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 from pymatgen.core.composition import Composition
-from pymatgen.entries.computed_entries import ComputedEntry
+from pymatgen.entries.computed_entries import ComputedEntry, GibbsComputedStructureEntry
 
 from ..core.logging import get_logger
 from ..core.config import settings
+from ..core.security import hash_api_key
+from .cache import entry_cache
+from .circuit_breaker import mp_breaker
+from .client_pool import PoolSaturated, client_pool, received_bytes
+from .compact_entries import CompactEntrySet
+from .deadline import Deadline, RequestCancelled
 
 logger = get_logger(__name__)
 
+# Thermo document fields needed for hull construction and the phase table
+SLIM_FIELDS = [
+    "material_id", "energy_type", "composition", "energy_per_atom", "uncorrected_energy_per_atom"
+]
+
+# Entry ID suffix of each run type, as in the IDs of full Materials Project entries
+RUN_TYPE_SUFFIXES = {"R2SCAN": "r2SCAN", "R2SCAN+U": "r2SCAN+U"}
+
+# Background refreshes of stale cache entries
+_refresh_executor = ThreadPoolExecutor(max_workers=settings.mp_refresh_workers, thread_name_prefix="mp-refresh")
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+
+class MaterialsProjectUnavailable(Exception):
+    """Materials Project could not be reached or the circuit breaker is open."""
+    
+    def __init__(self, message: str, retry_after: int = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def status_code(error: Exception) -> Optional[int]:
+    """HTTP status of a failed Materials Project request, if the error carries one."""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        match = re.search(r"status code (\d{3})", str(error))
+        status = int(match.group(1)) if match else None
+    return status
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """Whether an error is the upstream's fault: a 5xx, timeout or connection error."""
+    status = status_code(error)
+    return status is None or status >= 500
+
 
 class MaterialsProjectClient:
     """Client for Materials Project API interactions."""
     
     def __init__(self, api_key: str):
         self.api_key = api_key
-        self._client = None
     
-    def get_client(self) -> MPRester:
-        """Get or create MP client instance."""
-        if self._client is None:
-            self._client = MPRester(api_key=self.api_key)
-        return self._client
+    def get_client(self):
+        """Borrow the pooled MP client instance for this API key."""
+        return client_pool.session(self.api_key)
     
     def get_elements_from_formulas(self, formulas: List[str]) -> List[str]:
         """Extract unique element symbols from chemical formulas."""
@@ -48,64 +92,349 @@ class MaterialsProjectClient:
         
         return functional_map[functional]
     
+    def cache_key(self, elements: List[str], temperature: int, functional: str) -> Tuple:
+        """
+        Build the cache key for a chemical system query.
+        
+        Keys include the API key hash so cached data is only served back
+        to the credentials that fetched it.
+        """
+        return (hash_api_key(self.api_key), tuple(sorted(elements)), temperature, functional)
+    
     def fetch_entries(
         self,
         elements: List[str],
         temperature: int,
-        functional: str
+        functional: str,
+        deadline: Optional[Deadline] = None
     ) -> List[ComputedEntry]:
         """
         Fetch computed entries from Materials Project.
         
+        Cached entries past their TTL but within cache_stale_ttl are returned
+        immediately and refreshed in the background.
+        
         Args:
             elements: List of element symbols
             temperature: Temperature in Kelvin (0 for 0K, >0 for Gibbs)
             functional: DFT functional type
+            deadline: Request deadline checked before each upstream query
             
         Returns:
-            List of computed entries
+            List of computed entries (lightweight, without structures or data)
+            
+        Raises:
+            ValueError: Invalid API key, too many elements or no materials found
+            MaterialsProjectUnavailable: Materials Project is down or too slow
+            PoolSaturated: The API key has too many upstream requests in flight
+            RequestCancelled: The request was cancelled or ran out of time
         """
+        num_elements = len(set(elements))
+        if num_elements > settings.mp_max_elements:
+            raise ValueError(
+                f"Chemical systems can have at most {settings.mp_max_elements} elements, "
+                f"got {num_elements}"
+            )
+        
+        key = self.cache_key(elements, temperature, functional)
+        cached, stale = entry_cache.lookup(key)
+        if cached is not None:
+            if stale:
+                logger.info(f"Serving {len(cached)} stale cached entries for elements: {elements}, T={temperature}K")
+                self._refresh_in_background(key, elements, temperature, functional)
+            else:
+                logger.info(f"Using {len(cached)} cached entries for elements: {elements}, T={temperature}K")
+            return cached.to_entries()
+        
+        compact = self._fetch_with_retries(elements, temperature, functional, deadline)
+        entry_cache.set(key, compact)
+        return compact.to_entries()
+    
+    def _fetch_with_retries(
+        self,
+        elements: List[str],
+        temperature: int,
+        functional: str,
+        request_deadline: Optional[Deadline] = None
+    ) -> CompactEntrySet:
+        """
+        Fetch entries through the Materials Project circuit breaker.
+        
+        Upstream failures (timeouts, connection and server errors) are retried
+        with exponential backoff and jitter, for at most mp_retry_attempts
+        attempts and never past mp_fetch_deadline or the request deadline.
+        Client errors are raised at once. Only upstream failures count
+        towards opening the circuit, which all API keys share.
+        
+        Raises:
+            ValueError: Invalid API key or no materials found
+            MaterialsProjectUnavailable: Circuit open or retries exhausted
+            PoolSaturated: The API key has too many upstream requests in flight
+            RequestCancelled: The request was cancelled or ran out of time
+        """
+        deadline = time.monotonic() + settings.mp_fetch_deadline
+        if request_deadline is not None:
+            deadline = min(deadline, time.monotonic() + request_deadline.remaining())
+        attempt = 0
+        
+        while True:
+            if request_deadline is not None:
+                request_deadline.check("fetch")
+            permit = mp_breaker.allow()
+            if permit is None:
+                raise MaterialsProjectUnavailable(
+                    "Materials Project is currently unavailable, please try again later",
+                    retry_after=mp_breaker.retry_after()
+                )
+            
+            attempt += 1
+            try:
+                entries = self._fetch_uncached(elements, temperature, functional, request_deadline)
+            except ValueError:
+                # The upstream answered; the request itself was bad
+                mp_breaker.record_success(permit)
+                raise
+            except (RequestCancelled, PoolSaturated):
+                # No verdict on the upstream
+                mp_breaker.abandon(permit)
+                raise
+            except Exception as e:
+                if not is_upstream_failure(e):
+                    # Throttled for this API key only; not a verdict on the upstream
+                    mp_breaker.abandon(permit)
+                    raise MaterialsProjectUnavailable(f"Materials Project API error: {str(e)}", retry_after=1)
+                mp_breaker.record_failure(permit)
+                delay = settings.mp_retry_backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.0)
+                if attempt >= settings.mp_retry_attempts or time.monotonic() + delay > deadline:
+                    logger.error(f"Error fetching entries after {attempt} attempts: {e}")
+                    raise MaterialsProjectUnavailable(
+                        f"Materials Project API error: {str(e)}",
+                        retry_after=max(1, mp_breaker.retry_after())
+                    )
+                logger.warning(f"Error fetching entries (attempt {attempt}), retrying in {delay:.2f}s: {e}")
+                time.sleep(delay)
+                continue
+            
+            mp_breaker.record_success(permit)
+            break
+        
+        logger.info(f"Retrieved {len(entries)} entries from Materials Project")
+        
+        if not entries:
+            raise ValueError(
+                f"No materials found for elements {elements} in Materials Project database"
+            )
+        
+        return CompactEntrySet.from_entries(entries)
+    
+    def _fetch_uncached(
+        self,
+        elements: List[str],
+        temperature: int,
+        functional: str,
+        deadline: Optional[Deadline] = None
+    ) -> List[ComputedEntry]:
+        """Query Materials Project once, mapping authentication failures to ValueError."""
         thermo_types = self.get_functional_mapping(functional)
         additional_criteria = {"thermo_types": thermo_types}
         
         logger.info(f"Fetching entries for elements: {elements}, T={temperature}K, functional={functional}")
         
         try:
+            if settings.mp_parallel_fetch and len(elements) >= settings.mp_parallel_min_elements:
+                return self._fetch_subsystems(elements, temperature, functional, deadline)
+            if self._use_slim(temperature):
+                return self._search_slim(self.get_subsystems(elements), functional)
             with self.get_client() as client:
                 if temperature == 0:
-                    entries = client.get_entries_in_chemsys(
-                        elements,
-                        additional_criteria=additional_criteria
-                    )
-                else:
-                    entries = client.get_entries_in_chemsys(
+                    return client.get_entries_in_chemsys(
                         elements,
-                        use_gibbs=temperature,
                         additional_criteria=additional_criteria
                     )
-            
-            logger.info(f"Retrieved {len(entries)} entries from Materials Project")
-            
-            if not entries:
-                raise ValueError(
-                    f"No materials found for elements {elements} in Materials Project database"
+                return client.get_entries_in_chemsys(
+                    elements,
+                    use_gibbs=temperature,
+                    additional_criteria=additional_criteria
                 )
-            
-            return entries
-            
+        
+        except ValueError:
+            raise
         except Exception as e:
-            logger.error(f"Error fetching entries: {e}")
-            if "Invalid authentication credentials" in str(e):
-                raise ValueError("Invalid Materials Project API key")
-            elif "REST query returned with error status code 401" in str(e):
+            status = status_code(e)
+            if "Invalid authentication credentials" in str(e) or status == 401:
                 raise ValueError("Invalid Materials Project API key")
+            if status is not None and 400 <= status < 500 and status != 429:
+                raise ValueError(f"Materials Project rejected the request: {str(e)}")
+            raise
+    
+    def _refresh_in_background(
+        self,
+        key: Tuple,
+        elements: List[str],
+        temperature: int,
+        functional: str
+    ):
+        """Refetch stale cached entries on the refresh pool, at most once per key."""
+        with _refresh_lock:
+            if key in _refreshing or mp_breaker.is_open:
+                return
+            _refreshing.add(key)
+        
+        def refresh():
+            try:
+                entry_cache.set(key, self._fetch_with_retries(elements, temperature, functional))
+                logger.info(f"Refreshed cached entries for elements: {elements}, T={temperature}K")
+            except Exception as e:
+                logger.warning(f"Background refresh failed for elements {elements}: {e}")
+            finally:
+                with _refresh_lock:
+                    _refreshing.discard(key)
+        
+        _refresh_executor.submit(refresh)
+    
+    def get_subsystems(self, elements: List[str]) -> List[Tuple[str, ...]]:
+        """All non-empty subsystems of a chemical system, e.g. Ba, O, Ba-O for Ba-O."""
+        elements = sorted(set(elements))
+        return [
+            combo
+            for size in range(1, len(elements) + 1)
+            for combo in itertools.combinations(elements, size)
+        ]
+    
+    def _fetch_subsystems(
+        self,
+        elements: List[str],
+        temperature: int,
+        functional: str,
+        deadline: Optional[Deadline] = None
+    ) -> List[ComputedEntry]:
+        """
+        Fetch a chemical system as its subsystems in parallel and merge them.
+        
+        Each subsystem query returns only entries of exactly that chemical
+        system, so the union equals the parent query. At 0 K every subsystem
+        result is cached on its own and reused by later queries that share it;
+        Gibbs entries need full structures, so they are converted after merging
+        and only the parent result is cached. Subsystem queries not yet
+        started when the deadline is cancelled or expires are skipped.
+        """
+        additional_criteria = {"thermo_types": self.get_functional_mapping(functional)}
+        use_cache = temperature == 0
+        
+        results = {}
+        missing = []
+        for subsystem in self.get_subsystems(elements):
+            cached = entry_cache.get(self._subsystem_key(subsystem, functional)) if use_cache else None
+            if cached is not None:
+                results[subsystem] = cached.to_entries()
             else:
-                raise ValueError(f"Materials Project API error: {str(e)}")
+                missing.append(subsystem)
+        
+        def fetch(subsystem: Tuple[str, ...]) -> List[ComputedEntry]:
+            if deadline is not None:
+                deadline.check("fetch")
+            if self._use_slim(temperature):
+                return self._search_slim([subsystem], functional)
+            with self.get_client() as client:
+                return client.get_entries("-".join(subsystem), additional_criteria=additional_criteria)
+        
+        logger.info(f"Fetching {len(missing)} of {len(results) + len(missing)} subsystems in parallel")
+        
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(settings.mp_fetch_workers, len(missing))) as executor:
+                for subsystem, entries in zip(missing, executor.map(fetch, missing)):
+                    results[subsystem] = entries
+                    if use_cache:
+                        entry_cache.set(
+                            self._subsystem_key(subsystem, functional),
+                            CompactEntrySet.from_entries(entries)
+                        )
+        
+        # Merge and dedupe by entry ID
+        merged = []
+        seen = set()
+        for subsystem in self.get_subsystems(elements):
+            for entry in results[subsystem]:
+                if entry.entry_id is not None and entry.entry_id in seen:
+                    continue
+                seen.add(entry.entry_id)
+                merged.append(entry)
+        
+        if temperature and merged:
+            merged = GibbsComputedStructureEntry.from_entries(merged, temp=temperature)
+        
+        return merged
+    
+    def _use_slim(self, temperature: int) -> bool:
+        """Slim fetches skip structures, which the Gibbs approximation needs."""
+        return settings.mp_slim_fetch and temperature == 0
+    
+    def _search_slim(self, subsystems: List[Tuple[str, ...]], functional: str) -> List[ComputedEntry]:
+        """
+        Fetch only the thermo fields needed for the hull and phase table.
+        
+        Requests composition, energies, run type and ID instead of full
+        entries with structures, and builds one lightweight ComputedEntry per
+        thermo document, with an entry ID such as mp-1143-GGA+U as the full
+        entries carry. Bytes received and parse time are logged.
+        
+        Args:
+            subsystems: Chemical systems to query (exact matches)
+            functional: DFT functional type
+            
+        Returns:
+            List of computed entries
+        """
+        thermo_types = self.get_functional_mapping(functional)
+        chemsys = ["-".join(subsystem) for subsystem in subsystems]
+        
+        with self.get_client() as client:
+            bytes_before = received_bytes()
+            start = time.perf_counter()
+            docs = client.materials.thermo.search(
+                chemsys=chemsys,
+                thermo_types=thermo_types,
+                all_fields=False,
+                fields=SLIM_FIELDS
+            )
+            fetched = time.perf_counter()
+            bytes_received = received_bytes() - bytes_before
+        
+        entries = []
+        for doc in docs:
+            composition = Composition(_doc_field(doc, "composition"))
+            num_atoms = composition.num_atoms
+            uncorrected = _doc_field(doc, "uncorrected_energy_per_atom")
+            corrected = _doc_field(doc, "energy_per_atom")
+            run_type = _doc_field(doc, "energy_type")
+            run_type = getattr(run_type, "value", run_type)
+            entries.append(ComputedEntry(
+                composition,
+                uncorrected * num_atoms,
+                correction=(corrected - uncorrected) * num_atoms,
+                entry_id=f"{_doc_field(doc, 'material_id')}-{RUN_TYPE_SUFFIXES.get(run_type, run_type)}"
+            ))
+        parsed = time.perf_counter()
+        
+        logger.info(f"Slim fetch of {','.join(chemsys)}: {len(entries)} entries, "
+                    f"{bytes_received} bytes, fetch {fetched - start:.3f}s, parse {parsed - fetched:.3f}s")
+        
+        return entries
+    
+    def _subsystem_key(self, subsystem: Tuple[str, ...], functional: str) -> Tuple:
+        """Cache key for the entries of exactly one (sub)system at 0 K."""
+        return self.cache_key(list(subsystem), 0, functional) + ("subsystem",)
     
     def __enter__(self):
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self._client is not None:
-            # MP client handles its own cleanup
-            pass
\ No newline at end of file
+        # Pooled MP clients outlive this wrapper and are closed by the pool
+        pass
+
+
+def _doc_field(doc, name: str):
+    """Read a field from a thermo document model or dict."""
+    if isinstance(doc, dict):
+        return doc[name]
+    return getattr(doc, name)
\ No newline at end of file
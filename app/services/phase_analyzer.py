@@ -1,12 +1,28 @@
 import json
-from typing import List, Dict, Any
-from pymatgen.analysis.phase_diagram import CompoundPhaseDiagram, PDPlotter
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+from pymatgen.analysis.chempot_diagram import ChemicalPotentialDiagram
+from pymatgen.analysis.phase_diagram import CompoundPhaseDiagram, PDPlotter, PhaseDiagram
 from pymatgen.core.composition import Composition
+from pymatgen.core.periodic_table import Element
 from pymatgen.entries.computed_entries import ComputedEntry
 
+from ..core.config import settings
 from ..core.logging import get_logger
-from ..models.responses import PhaseInfo, DiagramMetadata, DiagramResponse
+from ..models.responses import (
+    PhaseInfo, DiagramMetadata, DiagramResponse, CustomPhase, UnstablePhase, PhaseDataResponse,
+    DecompositionProduct, StabilityResult, StabilityMetadata, StabilityQueryResponse,
+    ReactionProfileResponse, HeatmapResponse, ChemicalPotentialDomain, ChemicalPotentialResponse
+)
+from .cache import diagram_cache
+from .deadline import Deadline
+from .entry_pruning import prune_above_terminals, prune_entries
+from .hull_update import add_entries, entries_above_hull
+from .hull_queries import HullQuery, composition_matrix, in_terminal_space, simplex_grid, terminal_weights
 from .materials_client import MaterialsProjectClient
+from .plot_builder import build_plot
+from .plot_render import optimize_plot
 
 logger = get_logger(__name__)
 
@@ -111,6 +127,18 @@ class PhaseAnalyzer:
             num_atoms=composition.num_atoms
         )
     
+    def _decomposition_products(self, decomposition: Dict[Any, float]) -> List[DecompositionProduct]:
+        """Convert a {entry: fraction} decomposition into response rows, largest first."""
+        products = []
+        for entry, amount in sorted(decomposition.items(), key=lambda x: -x[1]):
+            orig_entry = getattr(entry, 'original_entry', None) or entry
+            products.append(DecompositionProduct(
+                formula=orig_entry.composition.reduced_formula,
+                entry_id=self._extract_mp_id(orig_entry),
+                fraction=round(amount, 4)
+            ))
+        return products
+    
     def _extract_mp_id(self, entry: ComputedEntry) -> str:
         """Extract Materials Project ID from entry."""
         # Check different possible attributes for MP ID
@@ -134,7 +162,11 @@ class PhaseAnalyzer:
         temperature: int,
         energy_cutoff: float,
         functional: str,
-        api_key: str
+        api_key: str,
+        include_plot: bool = True,
+        deadline: Optional[Deadline] = None,
+        plot_formulas: Optional[List[str]] = None,
+        custom_entries: Optional[List[ComputedEntry]] = None
     ) -> DiagramResponse:
         """
         Generate phase diagram and extract phase information.
@@ -145,32 +177,86 @@ class PhaseAnalyzer:
             energy_cutoff: Energy cutoff for unstable phases
             functional: DFT functional type
             api_key: Materials Project API key
+            include_plot: Build the Plotly figure; if False, plot is None and
+                no plotting work is done
+            deadline: Request deadline checked between the fetch, hull, plot
+                and phase table stages
+            plot_formulas: Subset of the formulas to plot as a slice of the
+                full diagram, for systems with too many components to draw
+            custom_entries: User-supplied entries merged into the cached
+                diagram with an incremental hull update
             
         Returns:
             Complete diagram response with plot and phase info
+            
+        Raises:
+            ValueError: A plot was requested for more formulas than can be
+                drawn, or a custom entry lies outside the terminal compositions
+            RequestCancelled: The request was cancelled or ran out of time
         """
+        return self._generate_phase_diagram(
+            formulas, temperature, energy_cutoff, functional, include_plot, deadline,
+            plot_formulas, custom_entries
+        )[0]
+    
+    def _generate_phase_diagram(
+        self,
+        formulas: List[str],
+        temperature: int,
+        energy_cutoff: float,
+        functional: str,
+        include_plot: bool,
+        deadline: Optional[Deadline],
+        plot_formulas: Optional[List[str]],
+        custom_entries: Optional[List[ComputedEntry]]
+    ) -> Tuple[DiagramResponse, CompoundPhaseDiagram]:
+        """generate_phase_diagram, also returning the diagram with any custom entries merged in."""
         logger.info(f"Generating phase diagram for {formulas} at {temperature}K")
         
+        if include_plot and len(plot_formulas or formulas) > settings.max_formulas:
+            raise ValueError(
+                f"At most {settings.max_formulas} formulas can be plotted; set include_plot "
+                f"to false or choose up to {settings.max_formulas} plot_formulas to plot a slice"
+            )
+        
         # Get elements from formulas
         elements = self.materials_client.get_elements_from_formulas(formulas)
         
-        # Fetch entries from Materials Project
-        entries = self.materials_client.fetch_entries(elements, temperature, functional)
-        
-        # Build phase diagram
-        terminals = [Composition(f) for f in formulas]
-        phase_diagram = CompoundPhaseDiagram(
-            entries,
-            terminals,
-            normalize_terminal_compositions=True
+        # Build (or reuse) the phase diagram from entries pruned to the cutoff
+        phase_diagram, num_pruned = self.get_compound_phase_diagram(
+            formulas, temperature, functional, energy_cutoff, deadline
         )
+        custom_phases = None
+        if custom_entries:
+            phase_diagram, added = add_entries(phase_diagram, custom_entries)
+            custom_phases = self._custom_phases(phase_diagram, added)
+        entries = phase_diagram.original_entries
         
         # Generate plot
-        plotter = PDPlotter(phase_diagram, backend="plotly", show_unstable=energy_cutoff)
-        fig = plotter.get_plot()
-        plot_data = json.loads(fig.to_json())
+        plot_data, num_decimated = None, None
+        if include_plot:
+            plot_diagram = phase_diagram
+            if plot_formulas:
+                # The slice is a face of the full diagram, built from the same entries
+                plot_diagram, _ = self.get_compound_phase_diagram(
+                    plot_formulas, temperature, functional, energy_cutoff, deadline,
+                    system_formulas=formulas
+                )
+                if custom_entries:
+                    plot_diagram, _ = add_entries(plot_diagram, custom_entries, skip_outside=True)
+            if deadline is not None:
+                deadline.check("plot")
+            if settings.plot_native:
+                plot_data = build_plot(plot_diagram, energy_cutoff)
+            else:
+                plotter = PDPlotter(plot_diagram, backend="plotly", show_unstable=energy_cutoff)
+                fig = plotter.get_plot()
+                plot_data = json.loads(fig.to_json())
+            num_decimated = optimize_plot(plot_data)
         
         # Extract phase information
+        if deadline is not None:
+            deadline.check("phase table")
         phase_info = self.extract_phase_info(phase_diagram, entries, temperature)
         
         # Create metadata
@@ -179,13 +265,568 @@ class PhaseAnalyzer:
             elements=elements,
             e_cut=energy_cutoff,
             functional=functional,
-            num_phases=len(phase_info)
+            num_phases=len(phase_info),
+            num_entries=len(entries),
+            num_pruned=num_pruned,
+            num_decimated=num_decimated,
+            plot_formulas=plot_formulas if include_plot else None,
+            num_custom=len(custom_entries) if custom_entries else None
         )
         
         logger.info(f"Phase diagram generated successfully with {len(phase_info)} phases")
         
-        return DiagramResponse(
+        response = DiagramResponse(
             plot=plot_data,
             phase_info=phase_info,
+            metadata=metadata,
+            custom_phases=custom_phases
+        )
+        return response, phase_diagram
+    
+    def _custom_phases(self, phase_diagram: CompoundPhaseDiagram, added: List[Any]) -> List[CustomPhase]:
+        """Hull position of each added custom entry."""
+        stable = set(phase_diagram.stable_entries)
+        return [
+            CustomPhase(
+                formula=entry.original_entry.composition.reduced_formula,
+                entry_id=self._extract_mp_id(entry.original_entry),
+                energy_per_atom=round(entry.original_entry.energy_per_atom, 4),
+                e_above_hull=round(e_above_hull, 4),
+                stable=entry in stable
+            )
+            for entry, e_above_hull in zip(added, entries_above_hull(phase_diagram, added))
+        ]
+    
+    def get_phase_data(
+        self,
+        formulas: List[str],
+        temperature: int,
+        energy_cutoff: float,
+        functional: str,
+        custom_entries: Optional[List[ComputedEntry]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> PhaseDataResponse:
+        """
+        Phase table and hull distances without any plotting.
+        
+        Returns the stable phases as in generate_phase_diagram plus, for each
+        composition with no stable phase, its lowest entry within
+        energy_cutoff of the hull (the points the plot would show). Every
+        custom entry is listed in custom_phases, whatever its hull distance.
+        
+        Args:
+            formulas: List of chemical formulas
+            temperature: Temperature in Kelvin
+            energy_cutoff: Energy cutoff for unstable phases
+            functional: DFT functional type
+            custom_entries: User-supplied entries merged into the diagram
+            deadline: Request deadline checked between the fetch, hull and
+                phase table stages
+            
+        Returns:
+            Phase table, unstable phases, custom phases and metadata
+        """
+        # The diagram comes back with the custom entries already merged in
+        diagram, phase_diagram = self._generate_phase_diagram(
+            formulas, temperature, energy_cutoff, functional, include_plot=False, deadline=deadline,
+            plot_formulas=None, custom_entries=custom_entries
+        )
+        
+        # All entries against the hull in one vectorized pass
+        entries = phase_diagram.all_entries
+        query = HullQuery(phase_diagram)
+        fractions = query.fractions([entry.composition for entry in entries])
+        facet_idx, bary = query.locate(fractions)
+        hull_energies = query.hull_energies(facet_idx, bary)
+        reference_energies = query.reference_energies(fractions)
+        
+        originals = [getattr(entry, 'original_entry', None) or entry for entry in entries]
+        
+        lowest: Dict[str, Tuple[float, int]] = {}
+        for idx, entry in enumerate(entries):
+            e_above_hull = entry.energy_per_atom - hull_energies[idx]
+            formula = originals[idx].composition.reduced_formula
+            if formula not in lowest or e_above_hull < lowest[formula][0]:
+                lowest[formula] = (e_above_hull, idx)
+        
+        unstable = []
+        for formula, (e_above_hull, idx) in lowest.items():
+            if not PhaseDiagram.numerical_tol < e_above_hull <= energy_cutoff:
+                continue
+            entry = entries[idx]
+            unstable.append(UnstablePhase(
+                formula=formula,
+                entry_id=self._extract_mp_id(originals[idx]),
+                energy_per_atom=round(entry.energy_per_atom, 4),
+                formation_energy_per_atom=round(float(entry.energy_per_atom - reference_energies[idx]), 4),
+                e_above_hull=round(float(e_above_hull), 4)
+            ))
+        unstable.sort(key=lambda phase: phase.e_above_hull)
+        
+        return PhaseDataResponse(
+            phase_info=diagram.phase_info,
+            unstable_phases=unstable,
+            metadata=diagram.metadata,
+            custom_phases=diagram.custom_phases
+        )
+    
+    def get_compound_phase_diagram(
+        self,
+        formulas: List[str],
+        temperature: int,
+        functional: str,
+        energy_cutoff: Optional[float] = None,
+        deadline: Optional[Deadline] = None,
+        system_formulas: Optional[List[str]] = None
+    ) -> Tuple[CompoundPhaseDiagram, int]:
+        """
+        Get the phase diagram with the given formulas as terminals, building it once.
+        
+        The view is derived from the cached entries of the chemical system, so
+        switching terminals costs a projection of the cached entries rather
+        than a refetch. Only entries inside the terminal simplex are kept and
+        the hull is built in terminal space, which has fewer dimensions than
+        the elemental system whenever the terminals are compounds. When an
+        energy cutoff is given and pruning is enabled, entries that cannot
+        appear within the cutoff are dropped before hull construction.
+        
+        Args:
+            formulas: List of chemical formulas used as terminals
+            temperature: Temperature in Kelvin
+            functional: DFT functional type
+            energy_cutoff: Energy cutoff for unstable phases, or None to keep all entries
+            deadline: Request deadline checked before fetching and each hull build
+            system_formulas: Formulas whose chemical system supplies the entries,
+                e.g. the full request when building a plotted slice (defaults to formulas)
+            
+        Returns:
+            Tuple of (cached or freshly built CompoundPhaseDiagram, number of pruned entries)
+        """
+        elements = self.materials_client.get_elements_from_formulas(system_formulas or formulas)
+        terminals = [Composition(f) for f in formulas]
+        if not settings.prune_entries:
+            energy_cutoff = None
+        key = self.materials_client.cache_key(elements, temperature, functional) + (
+            tuple(t.reduced_formula for t in terminals),
+            energy_cutoff,
+        )
+        
+        def build() -> Tuple[CompoundPhaseDiagram, int]:
+            # Project the cached entries of the system onto the terminals; only
+            # entries inside the terminal simplex are transformed
+            system_entries, system_elements, fractions = self._get_system_entries(
+                elements, temperature, functional, deadline
+            )
+            terminal_fractions = composition_matrix(terminals, system_elements)
+            inside = in_terminal_space(fractions, terminal_fractions)
+            entries = [e for e, keep in zip(system_entries, inside) if keep]
+            logger.info(f"Projected {len(entries)} of {len(inside)} entries onto terminals {formulas}")
+            
+            num_pruned = 0
+            if energy_cutoff is not None:
+                entries, num_pruned = prune_entries(entries, energy_cutoff, settings.prune_margin)
+                weights = terminal_weights(
+                    composition_matrix([e.composition for e in entries], system_elements),
+                    terminal_fractions
+                )
+                entries, num_dominated = prune_above_terminals(
+                    entries, weights, energy_cutoff, settings.prune_margin
+                )
+                num_pruned += num_dominated
+            
+            if deadline is not None:
+                deadline.check("hull")
+            phase_diagram = CompoundPhaseDiagram(
+                entries,
+                terminals,
+                normalize_terminal_compositions=True
+            )
+            return phase_diagram, num_pruned
+        
+        return diagram_cache.get_or_create(key, build)
+    
+    def get_elemental_phase_diagram(
+        self,
+        elements: List[str],
+        temperature: int,
+        functional: str,
+        deadline: Optional[Deadline] = None
+    ) -> PhaseDiagram:
+        """
+        Get the elemental phase diagram for a chemical system, building it once.
+        
+        Args:
+            elements: List of element symbols
+            temperature: Temperature in Kelvin
+            functional: DFT functional type
+            deadline: Request deadline checked before fetching and the hull build
+            
+        Returns:
+            Cached or freshly built PhaseDiagram
+        """
+        key = self.materials_client.cache_key(elements, temperature, functional) + ("elemental",)
+        
+        def build() -> PhaseDiagram:
+            entries = self._get_system_entries(elements, temperature, functional, deadline)[0]
+            logger.info(f"Building elemental phase diagram for {elements} from {len(entries)} entries")
+            return PhaseDiagram(entries)
+        
+        return diagram_cache.get_or_create(key, build)
+    
+    def _get_system_entries(
+        self,
+        elements: List[str],
+        temperature: int,
+        functional: str,
+        deadline: Optional[Deadline] = None
+    ) -> Tuple[List[ComputedEntry], List[Element], np.ndarray]:
+        """Cached entries of a chemical system with their atomic fractions, without building a hull."""
+        key = self.materials_client.cache_key(elements, temperature, functional) + ("entries",)
+        
+        def build() -> Tuple[List[ComputedEntry], List[Element], np.ndarray]:
+            entries = self.materials_client.fetch_entries(elements, temperature, functional, deadline)
+            if deadline is not None:
+                deadline.check("hull")
+            system_elements = sorted({el for e in entries for el in e.composition.elements})
+            fractions = composition_matrix([e.composition for e in entries], system_elements)
+            return entries, system_elements, fractions
+        
+        return diagram_cache.get_or_create(key, build)
+    
+    def query_stability(
+        self,
+        elements: List[str],
+        compositions: List[str],
+        temperature: int,
+        functional: str,
+        deadline: Optional[Deadline] = None
+    ) -> StabilityQueryResponse:
+        """
+        Evaluate hull distance and decomposition for many compositions at once.
+        
+        The energy above hull refers to the lowest-energy Materials Project entry
+        at each composition and is None where no such entry exists.
+        
+        Args:
+            elements: List of element symbols of the chemical system
+            compositions: Chemical formulas to evaluate
+            temperature: Temperature in Kelvin
+            functional: DFT functional type
+            deadline: Request deadline checked before fetching and the hull build
+            
+        Returns:
+            Stability results in the order of the input compositions
+        """
+        try:
+            parsed = [Composition(c) for c in compositions]
+        except Exception as e:
+            raise ValueError(f"Invalid chemical formula in compositions: {e}")
+        
+        phase_diagram = self.get_elemental_phase_diagram(elements, temperature, functional, deadline)
+        query = HullQuery(phase_diagram)
+        
+        fractions = query.fractions(parsed)
+        facet_idx, bary = query.locate(fractions)
+        hull_energies = query.hull_energies(facet_idx, bary)
+        formation_energies = hull_energies - query.reference_energies(fractions)
+        decompositions = query.decompositions(facet_idx, bary)
+        
+        # Lowest-energy entry per reduced composition
+        lowest: Dict[str, ComputedEntry] = {}
+        for entry in phase_diagram.all_entries:
+            formula = entry.composition.reduced_formula
+            if formula not in lowest or entry.energy_per_atom < lowest[formula].energy_per_atom:
+                lowest[formula] = entry
+        
+        results = []
+        for comp, raw, hull_e, form_e, decomp in zip(
+            parsed, compositions, hull_energies, formation_energies, decompositions
+        ):
+            formula = comp.reduced_formula
+            entry = lowest.get(formula)
+            e_above_hull = None
+            if entry is not None:
+                e_above_hull = round(max(0.0, entry.energy_per_atom - hull_e), 4)
+            
+            results.append(StabilityResult(
+                composition=raw,
+                reduced_formula=formula,
+                hull_energy_per_atom=round(hull_e, 4),
+                formation_energy_per_atom=round(form_e, 4),
+                e_above_hull=e_above_hull,
+                entry_id=self._extract_mp_id(entry) if entry is not None else None,
+                decomposition=self._decomposition_products(decomp)
+            ))
+        
+        metadata = StabilityMetadata(
+            temperature=temperature,
+            elements=[str(el) for el in phase_diagram.elements],
+            functional=functional,
+            num_entries=len(phase_diagram.all_entries),
+            num_stable=len(phase_diagram.stable_entries)
+        )
+        
+        logger.info(f"Evaluated stability of {len(results)} compositions in {'-'.join(elements)}")
+        
+        return StabilityQueryResponse(results=results, metadata=metadata)
+    
+    def get_reaction_profile(
+        self,
+        formulas: List[str],
+        reactants: List[str],
+        temperature: int,
+        energy_cutoff: float,
+        functional: str,
+        num_points: int,
+        deadline: Optional[Deadline] = None
+    ) -> ReactionProfileResponse:
+        """
+        Evaluate the reaction energy along the tie line between two terminals.
+        
+        The reaction energy at mixing ratio x is the hull energy of
+        x * A + (1 - x) * B minus the energy of the unreacted mixture, per atom
+        of the normalized terminals. All grid points are evaluated in one
+        vectorized pass over the hull facets.
+        
+        Args:
+            formulas: List of chemical formulas used as terminals
+            reactants: The two terminals to mix (A, B)
+            temperature: Temperature in Kelvin
+            energy_cutoff: Energy cutoff of the diagram (selects the cached diagram)
+            functional: DFT functional type
+            num_points: Number of mixing ratios between 0 and 1
+            deadline: Request deadline checked before fetching and the hull build
+            
+        Returns:
+            Reaction profile with the most exothermic mixing ratio and its products
+        """
+        reduced = [Composition(f).reduced_formula for f in formulas]
+        indices = []
+        for reactant in reactants:
+            formula = Composition(reactant).reduced_formula
+            if formula not in reduced:
+                raise ValueError(f"Reactant {reactant} is not one of the input formulas")
+            indices.append(reduced.index(formula))
+        if indices[0] == indices[1]:
+            raise ValueError("Reactants must be two different input formulas")
+        
+        phase_diagram, _ = self.get_compound_phase_diagram(
+            formulas, temperature, functional, energy_cutoff, deadline
+        )
+        query = HullQuery(phase_diagram)
+        
+        ratios = np.linspace(0, 1, num_points)
+        fractions = np.zeros((num_points, len(query.elements)))
+        fractions[:, indices[0]] = ratios
+        fractions[:, indices[1]] = 1 - ratios
+        
+        facet_idx, bary = query.locate(fractions)
+        energies = query.hull_energies(facet_idx, bary) - query.reference_energies(fractions)
+        
+        best = int(np.argmin(energies))
+        products = self._decomposition_products(
+            query.decompositions(facet_idx[best:best + 1], bary[best:best + 1])[0]
+        )
+        
+        metadata = DiagramMetadata(
+            temperature=temperature,
+            elements=self.materials_client.get_elements_from_formulas(formulas),
+            e_cut=energy_cutoff,
+            functional=functional,
+            num_phases=len(phase_diagram.stable_entries)
+        )
+        
+        logger.info(f"Reaction profile {reactants[0]} + {reactants[1]}: "
+                    f"min {energies[best]:.4f} eV/atom at x={ratios[best]:.4f}")
+        
+        return ReactionProfileResponse(
+            reactants=[formulas[i] for i in indices],
+            mixing_ratio=round(float(ratios[best]), 4),
+            reaction_energy_per_atom=round(float(energies[best]), 4),
+            products=products,
+            ratios=np.round(ratios, 4).tolist(),
+            energies=np.round(energies, 4).tolist(),
             metadata=metadata
-        )
\ No newline at end of file
+        )
+    
+    def get_stability_heatmap(
+        self,
+        formulas: List[str],
+        temperature: int,
+        energy_cutoff: float,
+        functional: str,
+        resolution: int,
+        deadline: Optional[Deadline] = None
+    ) -> HeatmapResponse:
+        """
+        Evaluate the energy above hull over a grid spanning the terminal simplex.
+        
+        The value at each grid point is the energy of the unreacted terminal
+        mixture above the hull (>= 0), computed for the whole grid in one
+        vectorized pass over the hull facets.
+        
+        Args:
+            formulas: List of chemical formulas used as terminals
+            temperature: Temperature in Kelvin
+            energy_cutoff: Energy cutoff of the diagram (selects the cached diagram)
+            functional: DFT functional type
+            resolution: Number of grid divisions along each edge
+            deadline: Request deadline checked before fetching and the hull build
+            
+        Returns:
+            Flattened heatmap values with per-point phase regions
+        """
+        phase_diagram, _ = self.get_compound_phase_diagram(
+            formulas, temperature, functional, energy_cutoff, deadline
+        )
+        query = HullQuery(phase_diagram)
+        
+        fractions = simplex_grid(len(formulas), resolution) / resolution
+        facet_idx, bary = query.locate(fractions)
+        values = query.reference_energies(fractions) - query.hull_energies(facet_idx, bary)
+        values = np.clip(values, 0, None)
+        
+        # Renumber facets compactly and describe each region by its stable phases
+        used, region_idx = np.unique(facet_idx, return_inverse=True)
+        regions = []
+        for facet in used:
+            vertices = query.facets[facet] if facet >= 0 else []
+            products = self._decomposition_products({phase_diagram.qhull_entries[v]: 1.0 for v in vertices})
+            regions.append(sorted(p.formula for p in products))
+        
+        metadata = DiagramMetadata(
+            temperature=temperature,
+            elements=self.materials_client.get_elements_from_formulas(formulas),
+            e_cut=energy_cutoff,
+            functional=functional,
+            num_phases=len(phase_diagram.stable_entries)
+        )
+        
+        logger.info(f"Stability heatmap for {formulas}: {len(values)} points, {len(regions)} regions")
+        
+        return HeatmapResponse(
+            terminals=formulas,
+            resolution=resolution,
+            values=np.round(values, 4).tolist(),
+            facets=region_idx.astype(int).tolist(),
+            regions=regions,
+            metadata=metadata
+        )
+    
+    def get_chemical_potential_diagram(
+        self,
+        formulas: List[str],
+        temperature: int,
+        functional: str,
+        deadline: Optional[Deadline] = None
+    ) -> ChemicalPotentialResponse:
+        """
+        Chemical potential diagram of the chemical system of the formulas.
+        
+        Built from the cached entries of the system, the same ones the
+        composition diagrams are projected from, and cached under the same
+        key, so switching between the views neither refetches entries nor
+        rebuilds a hull.
+        
+        Args:
+            formulas: List of chemical formulas spanning the system
+            temperature: Temperature in Kelvin
+            functional: DFT functional type
+            deadline: Request deadline checked before fetching and building the diagram
+            
+        Returns:
+            Stability domain of each stable phase in formal chemical potentials
+            
+        Raises:
+            ValueError: Too many elements, or an element has no reference entry
+        """
+        elements = self.materials_client.get_elements_from_formulas(formulas)
+        if len(elements) > settings.max_chempot_elements:
+            raise ValueError(
+                f"Chemical potential diagrams support at most {settings.max_chempot_elements} "
+                f"elements, got {len(elements)}"
+            )
+        
+        key = self.materials_client.cache_key(elements, temperature, functional) + (
+            "chempot", settings.chempot_min_potential
+        )
+        
+        def build() -> Tuple[List[str], List[ChemicalPotentialDomain]]:
+            entries, system_elements, fractions = self._get_system_entries(
+                elements, temperature, functional, deadline
+            )
+            energies = np.array([e.energy_per_atom for e in entries])
+            
+            # Only elemental references and entries below them can bound a domain,
+            # so the diagram is built from those instead of every entry
+            pure = fractions.max(axis=1) > 1 - PhaseDiagram.numerical_tol
+            references = np.full(len(system_elements), np.nan)
+            reference_idx = []
+            for col, el in enumerate(system_elements):
+                candidates = np.flatnonzero(pure & (fractions[:, col] > 0.5))
+                if len(candidates) == 0:
+                    raise ValueError(f"No elemental reference entry for {el}")
+                best = candidates[np.argmin(energies[candidates])]
+                references[col] = energies[best]
+                reference_idx.append(best)
+            formation = energies - fractions @ references
+            keep = formation < -PhaseDiagram.formation_energy_tol
+            keep[reference_idx] = True
+            candidates = [entry for entry, k in zip(entries, keep) if k]
+            
+            diagram = ChemicalPotentialDiagram(
+                candidates, default_min_limit=settings.chempot_min_potential
+            )
+            
+            # Renormalized entries lose their IDs; map back by formula
+            lowest: Dict[str, ComputedEntry] = {}
+            for entry in candidates:
+                formula = entry.composition.reduced_formula
+                if formula not in lowest or entry.energy_per_atom < lowest[formula].energy_per_atom:
+                    lowest[formula] = entry
+            
+            domains = [
+                ChemicalPotentialDomain(
+                    formula=formula,
+                    entry_id=self._extract_mp_id(lowest[formula]),
+                    vertices=self._domain_vertices(points).tolist()
+                )
+                for formula, points in sorted(diagram.domains.items())
+            ]
+            logger.info(f"Chemical potential diagram for {elements}: {len(domains)} domains "
+                        f"from {len(candidates)} of {len(entries)} entries")
+            return [str(el) for el in diagram.elements], domains
+        
+        diagram_elements, domains = diagram_cache.get_or_create(key, build)
+        
+        metadata = DiagramMetadata(
+            temperature=temperature,
+            elements=elements,
+            e_cut=0.0,
+            functional=functional,
+            num_phases=len(domains)
+        )
+        
+        return ChemicalPotentialResponse(
+            elements=diagram_elements,
+            min_potential=settings.chempot_min_potential,
+            domains=domains,
+            metadata=metadata
+        )
+    
+    def _domain_vertices(self, points: np.ndarray) -> np.ndarray:
+        """
+        Distinct vertices of a domain, rounded, in boundary order where it is a polygon.
+        
+        A domain spans one dimension less than the diagram: two-element
+        domains are segments, three-element domains planar polygons, which
+        are ordered by angle around their centroid in their own plane.
+        """
+        vertices = np.unique(np.round(points, 4), axis=0)
+        if vertices.shape[1] != 3 or len(vertices) < 3:
+            return vertices
+        centered = vertices - vertices.mean(axis=0)
+        # The two leading right singular vectors span the plane of the polygon
+        basis = np.linalg.svd(centered, full_matrices=False)[2][:2]
+        planar = centered @ basis.T
+        return vertices[np.argsort(np.arctan2(planar[:, 1], planar[:, 0]))]
@@ -0,0 +1,354 @@
+import copy
+import itertools
+import json
+import math
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import plotly.graph_objects as go
+from pymatgen.analysis.phase_diagram import PhaseDiagram, plotly_layouts, uniquelines
+from pymatgen.util.string import htmlify
+
+from ..core.logging import get_logger
+from .hull_queries import HullQuery, composition_matrix
+from .plot_render import UNSTABLE_TRACE
+
+logger = get_logger(__name__)
+
+# Gibbs tetrahedron basis, as in pymatgen's tet_coord
+_TETRAHEDRON = np.array([
+    [1, 0, 0],
+    [0.5, math.sqrt(3) / 2, 0],
+    [0.5, 1 / 3 * math.sqrt(3) / 2, math.sqrt(6) / 3],
+])
+
+_LAYOUTS = {2: "default_binary_layout", 3: "default_ternary_2d_layout", 4: "default_quaternary_layout"}
+_MARKER_SETTINGS = {
+    2: "default_binary_marker_settings",
+    3: "default_ternary_2d_marker_settings",
+    4: "default_quaternary_marker_settings",
+}
+_TRACE_TYPES = {2: "scatter", 3: "scatterternary", 4: "scatter3d"}
+
+_COLORBAR = {
+    "title": {"text": "Energy Above Hull<br>(eV/atom)"},
+    "x": 0, "y": 1, "yanchor": "top", "xpad": 0, "ypad": 0,
+    "thickness": 0.02, "thicknessmode": "fraction", "len": 0.5,
+}
+
+
+def build_plot(phase_diagram: PhaseDiagram, show_unstable: float) -> Dict[str, Any]:
+    """
+    Plotly figure JSON of a 2-4 component phase diagram.
+
+    Produces the same traces and layout as PDPlotter(backend="plotly",
+    ternary_style="2d").get_plot() followed by to_json(), but works on the
+    whole diagram at once: atomic fractions, formation energies and energies
+    above the hull of all entries come from one vectorized HullQuery pass,
+    plot coordinates from one matrix product with the Gibbs simplex basis,
+    and the lowest entry per composition from a NumPy group-by. Only the
+    hover texts of the plotted points and the per-facet traces are built in
+    Python, and no Plotly objects are validated apart from the layout.
+
+    Ternary points are given as atomic fractions where PDPlotter uses atom
+    counts; Plotly normalizes ternary coordinates, so they plot identically.
+
+    Args:
+        phase_diagram: Built PhaseDiagram or CompoundPhaseDiagram
+        show_unstable: Largest energy above hull (eV/atom) of plotted unstable points
+
+    Returns:
+        Figure as a {"data": [...], "layout": {...}} dict
+    """
+    dim = len(phase_diagram.elements)
+    if dim not in _TRACE_TYPES:
+        raise ValueError(f"Only 2-4 component diagrams can be plotted, got {dim}")
+
+    query = HullQuery(phase_diagram)
+    elements = query.elements
+
+    # Hull vertices: fractions of elements[1:] and energy per atom per row
+    qhull_data = np.asarray(phase_diagram.qhull_data)[:len(phase_diagram.qhull_entries)]
+    vertex_fractions = np.column_stack([
+        np.maximum(0.0, 1 - qhull_data[:, :-1].sum(axis=1)), qhull_data[:, :-1]
+    ])
+    vertex_form = qhull_data[:, -1] - query.reference_energies(vertex_fractions)
+    vertex_coords = _plot_coords(vertex_fractions, vertex_form, dim)
+
+    lines = list(uniquelines(phase_diagram.facets))
+    vertices = list(dict.fromkeys(idx for line in lines for idx in line))
+
+    # All entries in one pass; transformed entries recompute their composition on
+    # every access, so it is read once per entry
+    all_entries = phase_diagram.all_entries
+    compositions = [e.composition for e in all_entries]
+    fractions = composition_matrix(compositions, elements)
+    energies = np.array([e.energy / comp.num_atoms for e, comp in zip(all_entries, compositions)])
+    form_energies = energies - query.reference_energies(fractions)
+    e_above_hull = np.maximum(0.0, energies - query.hull_energies(*query.locate(fractions)))
+    stable = set(phase_diagram.stable_entries)
+    unstable = np.array([idx for idx, entry in enumerate(all_entries) if entry not in stable], dtype=int)
+    shown = _lowest_per_composition(unstable, fractions, e_above_hull)
+    shown = shown[e_above_hull[shown] <= show_unstable]
+    unstable_coords = _plot_coords(fractions[shown], form_energies[shown], dim)
+
+    qhull_entries = phase_diagram.qhull_entries
+    stable_entries = [qhull_entries[idx] for idx in vertices]
+    stable_texts = [
+        _hover_text(entry, vertex_form[idx], None, vertex_fractions[idx], elements, dim)
+        for entry, idx in zip(stable_entries, vertices)
+    ]
+    unstable_texts = [
+        _hover_text(all_entries[idx], form_energies[idx], e_above_hull[idx], fractions[idx], elements, dim)
+        for idx in shown.tolist()
+    ]
+
+    data: List[Dict[str, Any]] = [_lines_trace(lines, vertex_coords, dim)]
+    if dim != 3:
+        data.append(_labels_trace(stable_entries, vertex_coords[vertices], dim))
+    data.extend(_fill_traces(phase_diagram, vertex_coords, dim))
+
+    trace_type = _TRACE_TYPES[dim]
+    stable_trace = {"type": trace_type, **copy.deepcopy(plotly_layouts[_MARKER_SETTINGS[dim]])}
+    stable_trace.update(_axes(vertex_coords[vertices], dim), name="Stable", hovertext=stable_texts)
+    unstable_trace = {"type": trace_type, **copy.deepcopy(plotly_layouts[_MARKER_SETTINGS[dim]])}
+    unstable_trace.update(_axes(unstable_coords, dim), name=UNSTABLE_TRACE, hovertext=unstable_texts)
+    colors = [round(e, 3) for e in e_above_hull[shown].tolist()]
+    colorscale = plotly_layouts["unstable_colorscale"]
+
+    if dim == 2:
+        stable_trace.update(
+            marker={"color": "darkgreen", "size": 16, "line": {"color": "black", "width": 2}},
+            opacity=0.99,
+            error_y={"array": [0] * len(vertices), "type": "data", "color": "gray",
+                     "thickness": 2.5, "width": 5},
+        )
+        unstable_trace["marker"] = {
+            "color": colors, "colorscale": colorscale, "size": 7, "symbol": "diamond",
+            "line": {"color": "black", "width": 1}, "opacity": 0.8,
+        }
+    elif dim == 3:
+        stable_trace["marker"] = {
+            "color": "green", "line": {"width": 2.0, "color": "black"}, "symbol": "circle", "size": 15,
+        }
+        unstable_trace["marker"] = {
+            "color": colors, "opacity": 0.8, "colorscale": colorscale,
+            "line": {"width": 1, "color": "black"}, "size": 7, "symbol": "diamond",
+            "colorbar": copy.deepcopy(_COLORBAR),
+        }
+    else:
+        stable_trace["marker"] = {
+            "size": 7, "opacity": 0.99, "color": "darkgreen", "line": {"color": "black", "width": 1},
+        }
+        unstable_trace["marker"] = {
+            "color": colors, "colorscale": colorscale, "size": 5, "symbol": "diamond",
+            "line": {"color": "black", "width": 1}, "colorbar": copy.deepcopy(_COLORBAR),
+        }
+        unstable_trace["visible"] = "legendonly"
+    data.extend([stable_trace, unstable_trace])
+
+    logger.info(f"Built plot with {len(vertices)} stable and {len(shown)} unstable points")
+
+    return {"data": data, "layout": _layout(phase_diagram, stable_entries, vertex_coords[vertices], dim)}
+
+
+def _plot_coords(fractions: np.ndarray, form_energies: np.ndarray, dim: int) -> np.ndarray:
+    """Plot coordinates: (x, formation energy) for binaries, simplex fractions for
+    ternaries and tetrahedron coordinates for quaternaries."""
+    if dim == 2:
+        return np.column_stack([fractions[:, 1], form_energies])
+    if dim == 3:
+        return fractions
+    return fractions[:, 1:4] @ _TETRAHEDRON
+
+
+def _axes(coords: np.ndarray, dim: int) -> Dict[str, list]:
+    """Coordinate arrays of a trace under Plotly's axis names."""
+    keys = ("a", "b", "c") if dim == 3 else ("x", "y", "z")[:coords.shape[1]]
+    return {key: coords[:, col].tolist() for col, key in enumerate(keys)}
+
+
+def _lowest_per_composition(indices: np.ndarray, fractions: np.ndarray, e_above_hull: np.ndarray) -> np.ndarray:
+    """
+    Lowest entry of each composition among indices, in order of first appearance.
+
+    Ties keep the earlier entry, like PDPlotter's per-formula minimum.
+    """
+    if len(indices) == 0:
+        return indices
+    _, group = np.unique(np.round(fractions[indices], 8), axis=0, return_inverse=True)
+    group = group.ravel()
+    order = np.lexsort((indices, e_above_hull[indices], group))
+    first_in_group = np.r_[True, group[order][1:] != group[order][:-1]]
+    lowest = indices[order[first_in_group]]
+    _, first_seen = np.unique(group, return_index=True)
+    return lowest[np.argsort(first_seen, kind="stable")]
+
+
+def _display_entry(entry):
+    return getattr(entry, "original_entry", entry)
+
+
+def _hover_text(
+    entry,
+    form_energy: float,
+    e_above_hull: float,
+    fractions: np.ndarray,
+    elements: Sequence,
+    dim: int
+) -> str:
+    """Hover text in PDPlotter's format; e_above_hull is None for stable entries."""
+    original = _display_entry(entry)
+    entry_id = getattr(original, "entry_id", "no ID")
+    formula = htmlify(original.composition.reduced_formula)
+    text = f"{formula} ({entry_id}) <br>  Formation energy: {round(float(form_energy), 3)} eV/atom <br> "
+    if e_above_hull is None:
+        text += " (Stable)"
+    else:
+        text += f" Energy Above Hull: ({round(float(e_above_hull), 3):+} eV/atom)"
+    if dim > 2:
+        text += "<br>" + "".join(
+            f"<br> {el}: {round(float(frac), 6)}" for el, frac in zip(elements, fractions)
+        )
+    return text
+
+
+def _lines_trace(lines: List[tuple], vertex_coords: np.ndarray, dim: int) -> Dict[str, Any]:
+    """Hull edges as one line trace with None-separated segments."""
+    segments = vertex_coords[np.asarray(lines, dtype=int).reshape(-1, 2)]
+    columns = {}
+    for key, values in _axes(segments.reshape(-1, vertex_coords.shape[1]), dim).items():
+        columns[key] = [value for pair in zip(values[::2], values[1::2]) for value in (*pair, None)]
+    return {
+        "type": _TRACE_TYPES[dim],
+        **columns,
+        "mode": "lines",
+        "hoverinfo": "none",
+        "line": {"color": "black", "width": 4.0 if dim == 2 else 1.5},
+        "showlegend": False,
+    }
+
+
+def _labels_trace(stable_entries: List, coords: np.ndarray, dim: int) -> Dict[str, Any]:
+    """Formula labels of stable compounds (binary and quaternary only)."""
+    compounds = [idx for idx, entry in enumerate(stable_entries) if not entry.composition.is_element]
+    positions = coords[compounds].copy()
+    if dim == 2:
+        min_energy_x = coords[np.argmin(coords[:, 1]), 0]
+        right = positions[:, 0] >= min_energy_x
+        positions[:, 0] += np.where(right, 0.008, -0.008)
+        positions[:, 1] -= 0.013
+        textposition = ["bottom right" if r else "bottom left" for r in right.tolist()]
+    else:
+        positions[:, :2] -= 0.01
+        textposition = ["bottom right"] * len(compounds)
+    return {
+        "type": _TRACE_TYPES[dim],
+        **_axes(positions, dim),
+        "text": [htmlify(_display_entry(stable_entries[idx]).composition.reduced_formula) for idx in compounds],
+        "textposition": textposition,
+        "mode": "text",
+        "name": "Labels (stable)",
+        "hoverinfo": "skip",
+        "opacity": 1.0,
+        "visible": True if dim == 2 else "legendonly",
+        "showlegend": True,
+    }
+
+
+def _fill_traces(phase_diagram: PhaseDiagram, vertex_coords: np.ndarray, dim: int) -> List[Dict[str, Any]]:
+    """Shaded facets: filled triangles for ternaries, meshes for quaternaries."""
+    if dim == 2:
+        return []
+
+    traces = []
+    fillcolors = itertools.cycle(plotly_layouts["default_fill_colors"])
+    qhull_entries = phase_diagram.qhull_entries
+    for idx, facet in enumerate(phase_diagram.facets):
+        if dim == 3:
+            facet = sorted(facet, key=lambda vertex: qhull_entries[vertex].reduced_formula)
+            names = [htmlify(_display_entry(qhull_entries[vertex]).reduced_formula) for vertex in facet]
+            traces.append({
+                "type": "scatterternary",
+                **_axes(vertex_coords[facet], dim),
+                "mode": "lines",
+                "fill": "toself",
+                "line": {"width": 0},
+                "fillcolor": next(fillcolors),
+                "opacity": 0.15,
+                "hovertemplate": "<extra></extra>",
+                "name": "—".join(names),
+                "showlegend": False,
+            })
+        else:
+            trace = {
+                "type": "mesh3d",
+                **_axes(vertex_coords[list(facet)], dim),
+                "opacity": 0.05,
+                "alphahull": -1,
+                "flatshading": True,
+                "hoverinfo": "skip",
+                "color": next(fillcolors),
+                "legendgroup": "facets",
+            }
+            if idx == 1:
+                trace.update(showlegend=True, name="Hull Surfaces (toggle to access points easier)")
+            traces.append(trace)
+    return traces
+
+
+def _layout(phase_diagram: PhaseDiagram, stable_entries: List, coords: np.ndarray, dim: int) -> Dict[str, Any]:
+    """PDPlotter's layout with element annotations, normalized by Plotly."""
+    layout = copy.deepcopy(plotly_layouts[_LAYOUTS[dim]])
+    if dim == 3:
+        for el, axis in zip(phase_diagram.elements, ("a", "b", "c")):
+            el_ref = phase_diagram.el_refs[el]
+            title = str(el_ref.elements[0])
+            if hasattr(el_ref, "original_entry"):
+                title = htmlify(el_ref.original_entry.reduced_formula)
+            layout["ternary"][f"{axis}axis"]["title"] = {"text": title, "font": {"size": 24}}
+    else:
+        annotations = _element_annotations(stable_entries, coords, dim)
+        if dim == 2:
+            layout["xaxis"]["title"] = f"Composition (Fraction {phase_diagram.elements[1]})"
+            layout["annotations"] = annotations
+        else:
+            layout["scene"]["annotations"] = annotations
+
+    # Layout only, so Plotly's validation is cheap; it also adds the default template
+    fig = go.Figure(layout=layout)
+    fig.update_layout(coloraxis_colorbar={"yanchor": "top", "y": 0.05, "x": 1})
+    return json.loads(fig.to_json())["layout"]
+
+
+def _element_annotations(stable_entries: List, coords: np.ndarray, dim: int) -> List[Dict[str, Any]]:
+    """Labels of the terminal phases at the corners of the diagram."""
+    annotations = []
+    offset = 0.03 if dim == 2 else 0.06
+    for entry, coord in zip(stable_entries, coords.tolist()):
+        if not entry.composition.is_element:
+            continue
+        x, y = coord[0], coord[1]
+        text = str(entry.elements[0])
+        if hasattr(entry, "original_entry"):
+            text = htmlify(entry.original_entry.composition.reduced_formula)
+
+        if x < 0.4:
+            x -= offset
+        elif x > 0.6:
+            x += offset
+        if y < 0.1:
+            y -= offset
+        elif y > 0.8:
+            y += offset
+
+        annotation = dict(plotly_layouts["default_annotation_layout"])
+        annotation.update(x=x, y=y, font={"color": "#000000", "size": 24.0}, text=text, opacity=1.0)
+        if dim == 4:
+            z = coord[2]
+            if z > 0.8:
+                z += offset
+            del annotation["xref"], annotation["yref"]
+            annotation["z"] = z
+        annotations.append(annotation)
+    return annotations
@@ -0,0 +1,138 @@
+from typing import Any, Dict, List
+
+import numpy as np
+
+from ..core.config import settings
+from ..core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Name PDPlotter gives the trace of unstable entries
+UNSTABLE_TRACE = "Above Hull"
+
+# Per-point arrays of a marker trace, as (container, key) paths
+_POINT_FIELDS = [
+    (None, "x"), (None, "y"), (None, "z"), (None, "a"), (None, "b"), (None, "c"),
+    (None, "hovertext"), (None, "text"), (None, "customdata"),
+    ("marker", "color"), ("marker", "size"),
+    ("error_x", "array"), ("error_y", "array"), ("error_z", "array"),
+]
+
+
+def count_points(plot_data: Dict[str, Any]) -> int:
+    """Number of marker points across all traces of a figure."""
+    return sum(
+        _trace_length(trace) for trace in plot_data.get("data", [])
+        if "markers" in (trace.get("mode") or "")
+    )
+
+
+def decimate_unstable(plot_data: Dict[str, Any], resolution: int) -> int:
+    """
+    Merge overlapping unstable points in place.
+
+    Points of the unstable trace are binned on a grid with resolution cells
+    along each plot axis; each occupied cell keeps only its lowest-energy
+    point, whose hover text notes how many points it stands for.
+
+    Args:
+        plot_data: Plotly figure JSON from PDPlotter
+        resolution: Grid cells per axis
+
+    Returns:
+        Number of points removed
+    """
+    trace = next((t for t in plot_data.get("data", []) if t.get("name") == UNSTABLE_TRACE), None)
+    if trace is None:
+        return 0
+
+    n_points = _trace_length(trace)
+    axes = [key for key in ("x", "y", "z", "a", "b", "c") if _is_points(trace.get(key), n_points)]
+    if n_points < 2 or not axes:
+        return 0
+
+    coords = np.array([trace[key] for key in axes], dtype=float).T
+    span = np.ptp(coords, axis=0)
+    span[span == 0] = 1
+    cells = np.floor((coords - coords.min(axis=0)) / span * (resolution - 1) + 0.5).astype(int)
+
+    colors = trace.get("marker", {}).get("color")
+    energies = np.asarray(colors, dtype=float) if _is_points(colors, n_points) else np.zeros(n_points)
+
+    # Lowest energy first, so np.unique keeps the lowest point of each cell
+    order = np.argsort(energies, kind="stable")
+    _, first, counts = np.unique(cells[order], axis=0, return_index=True, return_counts=True)
+    keep = np.sort(order[first])
+    merged = dict(zip(order[first].tolist(), counts.tolist()))
+
+    if len(keep) == n_points:
+        return 0
+
+    keep = keep.tolist()
+    _take_points(trace, keep, n_points)
+    if _is_points(trace.get("hovertext"), len(keep)):
+        trace["hovertext"] = [
+            f"{text}<br>(+{merged[idx] - 1} overlapping)" if merged[idx] > 1 else text
+            for idx, text in zip(keep, trace["hovertext"])
+        ]
+
+    removed = n_points - len(keep)
+    logger.info(f"Decimated unstable points: {n_points} -> {len(keep)}")
+    return removed
+
+
+def use_webgl(plot_data: Dict[str, Any]) -> bool:
+    """
+    Switch 2D marker traces to WebGL in place.
+
+    Only cartesian scatter traces have a WebGL counterpart; 3D traces already
+    render with WebGL and Plotly has no WebGL ternary trace.
+
+    Returns:
+        True if any trace was switched
+    """
+    switched = False
+    for trace in plot_data.get("data", []):
+        if trace.get("type", "scatter") == "scatter" and "markers" in (trace.get("mode") or ""):
+            trace["type"] = "scattergl"
+            switched = True
+    return switched
+
+
+def optimize_plot(plot_data: Dict[str, Any]) -> int:
+    """
+    Prepare a PDPlotter figure for the browser.
+
+    Decimates overlapping unstable points when the figure has more than
+    plot_decimate_threshold points, and switches to WebGL traces when it has
+    more than plot_webgl_threshold points. Smaller figures are left as built.
+
+    Returns:
+        Number of unstable points removed
+    """
+    removed = 0
+    if settings.plot_decimate and count_points(plot_data) > settings.plot_decimate_threshold:
+        removed = decimate_unstable(plot_data, settings.plot_decimate_resolution)
+
+    if count_points(plot_data) > settings.plot_webgl_threshold and use_webgl(plot_data):
+        logger.info("Rendering marker traces with WebGL")
+
+    return removed
+
+
+def _trace_length(trace: Dict[str, Any]) -> int:
+    for key in ("x", "a"):
+        if isinstance(trace.get(key), list):
+            return len(trace[key])
+    return 0
+
+
+def _is_points(value: Any, n_points: int) -> bool:
+    return isinstance(value, list) and len(value) == n_points
+
+
+def _take_points(trace: Dict[str, Any], keep: List[int], n_points: int):
+    for container, key in _POINT_FIELDS:
+        parent = trace.get(container) if container else trace
+        if isinstance(parent, dict) and _is_points(parent.get(key), n_points):
+            parent[key] = [parent[key][idx] for idx in keep]
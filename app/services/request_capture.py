@@ -0,0 +1,55 @@
+import json
+import threading
+import time
+from typing import Optional
+
+from pydantic import BaseModel
+
+from ..core.config import settings
+from ..core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class RequestCapture:
+    """
+    Append-only NDJSON record of incoming API requests for workload replay.
+
+    Each line holds the arrival time, the endpoint path and the validated
+    request body in its wire format (aliases such as "f" and "temp"). API keys
+    are sent as headers and never reach the body, so they are not recorded.
+    The file is replayed with benchmarks/replay.py.
+    """
+
+    def __init__(self, path: Optional[str] = None, enabled: Optional[bool] = None):
+        self.path = path or settings.capture_file
+        self.enabled = settings.capture_requests if enabled is None else enabled
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, request: BaseModel):
+        """
+        Append one request to the capture file if capture is enabled.
+
+        Args:
+            endpoint: API path the request was posted to, e.g. "/api/diagrams/"
+            request: Validated request model
+        """
+        if not self.enabled:
+            return
+
+        line = json.dumps({
+            "ts": round(time.time(), 3),
+            "endpoint": endpoint,
+            "body": request.dict(by_alias=True),
+        }, separators=(",", ":"))
+
+        try:
+            with self._lock, open(self.path, "a") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            # Capture is diagnostic only; never fail the request over it
+            logger.warning(f"Could not write request capture to {self.path}: {e}")
+
+
+# Global request capture instance
+request_capture = RequestCapture()
@@ -0,0 +1,82 @@
+"""
+Memory benchmark: bytes per cached entry before and after compaction.
+
+Builds synthetic ComputedStructureEntry objects shaped like Materials Project
+thermo entries (structure, parameters and data dict) and measures the
+allocated memory of the full list, the CompactEntrySet that the entry cache
+now stores, and the lightweight ComputedEntry objects rebuilt from it.
+
+Usage:
+    python -m benchmarks.entry_memory [num_entries]
+"""
+import sys
+import tracemalloc
+
+import numpy as np
+from pymatgen.core import Lattice, Structure
+from pymatgen.entries.computed_entries import ComputedStructureEntry
+
+from app.services.compact_entries import CompactEntrySet
+
+ELEMENTS = ["Ba", "Si", "O", "Ti"]
+
+
+def make_mp_like_entries(num_entries: int, seed: int = 0):
+    """Synthetic entries with realistic per-entry payloads."""
+    rng = np.random.default_rng(seed)
+    entries = []
+    for idx in range(num_entries):
+        num_sites = int(rng.integers(4, 24))
+        species = [ELEMENTS[i] for i in rng.integers(0, len(ELEMENTS), size=num_sites)]
+        structure = Structure(Lattice.cubic(4 + num_sites ** (1 / 3)), species, rng.random((num_sites, 3)))
+        entries.append(ComputedStructureEntry(
+            structure,
+            energy=float(-5 * num_sites + rng.normal()),
+            correction=float(rng.normal()),
+            parameters={
+                "run_type": "GGA+U",
+                "is_hubbard": True,
+                "hubbards": {el: 0.0 for el in ELEMENTS},
+                "potcar_symbols": [f"PAW_PBE {el}" for el in ELEMENTS],
+            },
+            data={
+                "oxide_type": "oxide",
+                "aspherical": False,
+                "last_updated": "2024-01-01 00:00:00",
+                "task_id": f"mp-{1000000 + idx}",
+                "material_id": f"mp-{idx}",
+                "oxidation_states": {el: 0.0 for el in ELEMENTS},
+                "run_type": "GGA+U",
+            },
+            entry_id=f"mp-{idx}-GGA+U",
+        ))
+    return entries
+
+
+def measure(build):
+    """Return (object, bytes allocated while building it)."""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def main(num_entries: int = 2000):
+    full, full_bytes = measure(lambda: make_mp_like_entries(num_entries))
+    compact, compact_bytes = measure(lambda: CompactEntrySet.from_entries(full))
+    light, light_bytes = measure(compact.to_entries)
+
+    assert all(abs(a.energy - b.energy) < 1e-9 for a, b in zip(full, light))
+
+    print(f"{num_entries} entries")
+    print(f"  ComputedStructureEntry (MP-like):   {full_bytes / num_entries:10.0f} bytes/entry")
+    print(f"  CompactEntrySet (cached form):      {compact_bytes / num_entries:10.0f} bytes/entry "
+          f"({compact.nbytes / num_entries:.0f} including entry ID strings)")
+    print(f"  ComputedEntry rebuilt from compact: {light_bytes / num_entries:10.0f} bytes/entry")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,43 @@
+"""Synthetic oxide entries shared by the benchmarks and the tests."""
+import numpy as np
+from pymatgen.core.composition import Composition
+from pymatgen.entries.computed_entries import ComputedEntry
+
+TERMINALS = ["MgO", "Al2O3", "TiO2", "BaO", "ZnO", "CaO", "SrO"]
+
+
+def make_oxide_entries(num_terminals: int, num_entries: int, seed: int = 0):
+    """
+    Synthetic entries of the metal-oxygen system spanned by the first terminals.
+
+    Returns:
+        Tuple of (terminal formulas, entries)
+    """
+    rng = np.random.default_rng(seed)
+    terminals = [Composition(f) for f in TERMINALS[:num_terminals]]
+    metals = [str(t.elements[0]) for t in terminals]
+
+    entries = [ComputedEntry(Composition(el), -4.0, entry_id=f"ref-{el}") for el in metals + ["O"]]
+    entries += [
+        ComputedEntry(t, -7.0 * t.num_atoms, entry_id=f"term-{t.reduced_formula}") for t in terminals
+    ]
+
+    for idx in range(num_entries):
+        if rng.random() < 0.7:
+            # Mixed oxide inside the terminal simplex, near or above the plane
+            amounts = rng.integers(0, 4, size=num_terminals) * (rng.random(num_terminals) < 0.5)
+            if amounts.sum() == 0:
+                continue
+            composition = sum((t * int(n) for t, n in zip(terminals, amounts) if n), Composition())
+            energy = (-7.0 + rng.uniform(-0.15, 1.0)) * composition.num_atoms
+        else:
+            # Suboxide or alloy outside the simplex
+            amounts = rng.integers(0, 4, size=num_terminals + 1)
+            amounts[-1] = rng.integers(0, 2)
+            if amounts[:-1].sum() == 0:
+                continue
+            composition = Composition(dict(zip(metals + ["O"], amounts.tolist())))
+            energy = (-4.5 - rng.random()) * composition.num_atoms
+        entries.append(ComputedEntry(composition, energy, entry_id=f"mp-{idx}"))
+
+    return TERMINALS[:num_terminals], entries
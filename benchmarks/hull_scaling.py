@@ -0,0 +1,71 @@
+"""
+Hull benchmark: build time against the number of components.
+
+For 2 to 7 oxide terminals (MgO, Al2O3, TiO2, ...) builds a synthetic entry
+set of the metal-oxygen system, with compounds inside the oxide simplex and
+suboxides and alloys outside it, and times:
+
+- the elemental hull over all elements (the old path for every request),
+- the compound diagram in terminal space, as served by PhaseAnalyzer, with and
+  without pruning at the default energy cutoff.
+
+Usage:
+    python -m benchmarks.hull_scaling [num_entries] [max_components]
+"""
+import sys
+import time
+from unittest.mock import Mock
+
+from pymatgen.analysis.phase_diagram import PhaseDiagram
+from pymatgen.core.composition import Composition
+
+from app.core.config import settings
+from app.services.cache import diagram_cache
+from app.services.phase_analyzer import PhaseAnalyzer
+from benchmarks.fixtures import make_oxide_entries
+
+
+def time_compound(formulas, entries, prune: bool):
+    client = Mock()
+    client.get_elements_from_formulas.side_effect = lambda fs: sorted(
+        {str(el) for f in fs for el in Composition(f).elements}
+    )
+    client.cache_key.side_effect = lambda els, t, fn: (tuple(sorted(els)), t, fn)
+    client.fetch_entries.return_value = entries
+    analyzer = PhaseAnalyzer(client)
+
+    settings.prune_entries = prune
+    diagram_cache.clear()
+    start = time.perf_counter()
+    diagram, num_pruned = analyzer.get_compound_phase_diagram(
+        formulas, 0, "GGA_GGA_U", settings.default_energy_cutoff
+    )
+    return time.perf_counter() - start, diagram, num_pruned
+
+
+def main(num_entries: int = 1000, max_components: int = 7):
+    prune_setting = settings.prune_entries
+    print(f"{'n':>2} {'entries':>8} {'elemental':>10} {'facets':>7} "
+          f"{'terminal':>9} {'facets':>7} {'pruned':>9} {'facets':>7} {'dropped':>8}")
+    try:
+        for n in range(2, max_components + 1):
+            formulas, entries = make_oxide_entries(n, num_entries)
+
+            start = time.perf_counter()
+            elemental = PhaseDiagram(entries)
+            elemental_time = time.perf_counter() - start
+
+            full_time, full, _ = time_compound(formulas, entries, prune=False)
+            pruned_time, pruned, num_pruned = time_compound(formulas, entries, prune=True)
+            assert {e.name for e in full.stable_entries} == {e.name for e in pruned.stable_entries}
+
+            print(f"{n:>2} {len(entries):>8} {elemental_time:>9.3f}s {len(elemental.facets):>7} "
+                  f"{full_time:>8.3f}s {len(full.facets):>7} {pruned_time:>8.3f}s "
+                  f"{len(pruned.facets):>7} {num_pruned:>8}")
+    finally:
+        settings.prune_entries = prune_setting
+        diagram_cache.clear()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
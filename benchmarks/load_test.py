@@ -0,0 +1,75 @@
+"""
+Load test against a running PhaseNavigator instance.
+
+Fires concurrent diagram requests and reports throughput and latency
+percentiles, so changes to pooling, caching and scheduling can be compared
+on the same workload.
+
+Usage:
+    MP_API_KEY=... python -m benchmarks.load_test [--url URL] [--requests N] [--concurrency C]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import List
+
+import httpx
+
+DEFAULT_SYSTEMS = [
+    ["BaO", "SiO2"],
+    ["BaO", "BaSiO3"],
+    ["Li2O", "P2O5"],
+    ["BaO", "TiO2", "SiO2"],
+    ["Li2O", "CoO", "MnO2"],
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run(url: str, api_key: str, num_requests: int, concurrency: int, path: str = "/api/diagrams/"):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    statuses: dict = {}
+
+    async with httpx.AsyncClient(base_url=url, timeout=300) as client:
+        async def one(idx: int):
+            body = {"f": DEFAULT_SYSTEMS[idx % len(DEFAULT_SYSTEMS)], "temp": 0, "e_cut": 0.2}
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(path, json=body, headers={"X-API-KEY": api_key})
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(num_requests)))
+        elapsed = time.perf_counter() - start
+
+    print(f"{num_requests} requests, concurrency {concurrency}, {elapsed:.1f} s "
+          f"({num_requests / elapsed:.2f} req/s)")
+    print(f"  status codes: {statuses}")
+    print(f"  latency p50 {percentile(latencies, 50):.3f} s  p95 {percentile(latencies, 95):.3f} s  "
+          f"p99 {percentile(latencies, 99):.3f} s  mean {statistics.mean(latencies):.3f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=5)
+    args = parser.parse_args()
+
+    api_key = os.environ.get("MP_API_KEY")
+    if not api_key:
+        parser.error("MP_API_KEY environment variable is required")
+
+    asyncio.run(run(args.url, api_key, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
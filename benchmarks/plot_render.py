@@ -0,0 +1,72 @@
+"""
+Plot benchmark: figure size and render preparation for large diagrams.
+
+Builds a synthetic quaternary Ba-Si-O-Ti diagram with many unstable entries,
+plots it with show_unstable at the maximum energy cutoff and reports the
+number of marker points, the figure JSON size and the server-side time of
+PDPlotter and of the native trace builder, with and without optimize_plot
+(decimation and WebGL traces). Browser render time is not measured here; the
+UI logs it to the console as "Plot rendered in ... ms".
+
+Usage:
+    python -m benchmarks.plot_render [num_entries]
+"""
+import copy
+import json
+import sys
+import time
+
+import numpy as np
+from pymatgen.analysis.phase_diagram import PDPlotter, PhaseDiagram
+from pymatgen.core.composition import Composition
+from pymatgen.entries.computed_entries import ComputedEntry
+
+from app.core.config import settings
+from app.services.plot_builder import build_plot
+from app.services.plot_render import count_points, optimize_plot
+
+ELEMENTS = ["Ba", "Si", "O", "Ti"]
+
+
+def make_entries(num_entries: int, seed: int = 0):
+    """Elemental references plus random compounds near the hull."""
+    rng = np.random.default_rng(seed)
+    entries = [ComputedEntry(Composition(el), -5.0, entry_id=f"ref-{el}") for el in ELEMENTS]
+    for idx in range(num_entries):
+        amounts = rng.integers(0, 9, size=len(ELEMENTS))
+        if amounts.sum() == 0:
+            continue
+        composition = Composition(dict(zip(ELEMENTS, amounts.tolist())))
+        energy = (-5.0 - rng.random() * 1.5) * composition.num_atoms
+        entries.append(ComputedEntry(composition, energy, entry_id=f"mp-{idx}"))
+    return entries
+
+
+def main(num_entries: int = 3000):
+    diagram = PhaseDiagram(make_entries(num_entries))
+
+    start = time.perf_counter()
+    fig = PDPlotter(diagram, backend="plotly", show_unstable=settings.max_energy_cutoff).get_plot()
+    plot_data = json.loads(fig.to_json())
+    plotted = time.perf_counter()
+
+    native = build_plot(diagram, settings.max_energy_cutoff)
+    built = time.perf_counter()
+
+    optimized = copy.deepcopy(plot_data)
+    optimize_start = time.perf_counter()
+    removed = optimize_plot(optimized)
+    done = time.perf_counter()
+
+    print(f"{len(diagram.all_entries)} entries, {len(diagram.stable_entries)} stable")
+    print(f"  PDPlotter:     {count_points(plot_data):6d} points, "
+          f"{len(json.dumps(plot_data)) / 1024:8.1f} kB, {plotted - start:.2f}s")
+    print(f"  build_plot:    {count_points(native):6d} points, "
+          f"{len(json.dumps(native)) / 1024:8.1f} kB, {built - plotted:.2f}s")
+    print(f"  optimize_plot: {count_points(optimized):6d} points, "
+          f"{len(json.dumps(optimized)) / 1024:8.1f} kB, +{done - optimize_start:.3f}s "
+          f"({removed} merged, traces: {sorted({t.get('type') for t in optimized['data']})})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3000)
@@ -0,0 +1,112 @@
+"""
+Replay captured API traffic against a running PhaseNavigator instance.
+
+Reads a request capture written with capture_requests=true (one JSON line per
+request: arrival time, endpoint and body) and re-sends the same mix of
+requests, keeping their original spacing divided by --speed. Use --speed 0 to
+send them back to back, limited only by --concurrency. Reports status codes
+and latency percentiles overall and per endpoint, so cache sizing, worker
+counts and optimizations can be judged on the real workload.
+
+Usage:
+    MP_API_KEY=... python -m benchmarks.replay requests_capture.ndjson [--url URL] [--speed S]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.load_test import percentile
+
+
+def load_capture(path: str, limit: int = None) -> List[dict]:
+    """Captured requests in arrival order, with offsets in seconds from the first."""
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    records.sort(key=lambda record: record["ts"])
+    if limit:
+        records = records[:limit]
+    if records:
+        start = records[0]["ts"]
+        for record in records:
+            record["offset"] = record["ts"] - start
+    return records
+
+
+def summarize(name: str, latencies: List[float], statuses: Dict[int, int]):
+    print(f"  {name}: {len(latencies)} requests, status codes {statuses}")
+    print(f"    latency p50 {percentile(latencies, 50):.3f} s  p95 {percentile(latencies, 95):.3f} s  "
+          f"p99 {percentile(latencies, 99):.3f} s  mean {statistics.mean(latencies):.3f} s")
+
+
+async def replay(url: str, api_key: str, records: List[dict], speed: float, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: Dict[str, List[float]] = {}
+    statuses: Dict[str, Dict[int, int]] = {}
+    lateness: List[float] = []
+
+    async with httpx.AsyncClient(base_url=url, timeout=300) as client:
+        start = time.perf_counter()
+
+        async def one(record: dict):
+            scheduled = record["offset"] / speed if speed else 0.0
+            await asyncio.sleep(max(0.0, scheduled - (time.perf_counter() - start)))
+            async with semaphore:
+                lateness.append(time.perf_counter() - start - scheduled)
+                sent = time.perf_counter()
+                response = await client.post(
+                    record["endpoint"], json=record["body"], headers={"X-API-KEY": api_key}
+                )
+                await response.aread()
+                endpoint = record["endpoint"]
+                latencies.setdefault(endpoint, []).append(time.perf_counter() - sent)
+                counts = statuses.setdefault(endpoint, {})
+                counts[response.status_code] = counts.get(response.status_code, 0) + 1
+
+        await asyncio.gather(*(one(record) for record in records))
+        elapsed = time.perf_counter() - start
+
+    captured = records[-1]["offset"]
+    print(f"Replayed {len(records)} requests in {elapsed:.1f} s "
+          f"(captured over {captured:.1f} s, speed {speed or 'max'}, {len(records) / elapsed:.2f} req/s)")
+    print(f"  send lateness p95 {percentile(lateness, 95):.3f} s (client-side queueing at concurrency {concurrency})")
+
+    all_statuses: Dict[int, int] = {}
+    for counts in statuses.values():
+        for status, count in counts.items():
+            all_statuses[status] = all_statuses.get(status, 0) + count
+    summarize("all", [value for values in latencies.values() for value in values], all_statuses)
+    for endpoint in sorted(latencies):
+        summarize(endpoint, latencies[endpoint], statuses[endpoint])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", help="Request capture file (NDJSON)")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Timing scale: 1 = original, 2 = twice as fast, 0 = no delays")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maximum requests in flight")
+    parser.add_argument("--limit", type=int, default=None, help="Replay only the first N requests")
+    args = parser.parse_args()
+
+    api_key = os.environ.get("MP_API_KEY")
+    if not api_key:
+        parser.error("MP_API_KEY environment variable is required")
+    if args.speed < 0:
+        parser.error("--speed must be 0 or positive")
+
+    records = load_capture(args.capture, args.limit)
+    if not records:
+        parser.error(f"No requests in {args.capture}")
+
+    asyncio.run(replay(args.url, api_key, records, args.speed, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
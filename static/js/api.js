@@ -4,25 +4,177 @@
 
 const API_BASE_URL = '/api';
 
+// Browser cache of diagram responses
+const DIAGRAM_CACHE_DB = 'phasenav-cache';
+const DIAGRAM_CACHE_STORE = 'diagrams';
+const DIAGRAM_CACHE_MAX_ENTRIES = 50;
+const DIAGRAM_CACHE_MAX_BYTES = 50 * 1024 * 1024;
+const DIAGRAM_CACHE_FRESH_MS = 5 * 60 * 1000;  // served without revalidation
+
+/**
+ * IndexedDB-backed LRU cache of diagram responses.
+ *
+ * Entries are keyed by the canonical request and store the server's ETag,
+ * so older entries can be revalidated with If-None-Match. Every method
+ * resolves (to null on failure), so a missing or blocked IndexedDB only
+ * disables caching.
+ */
+class DiagramCache {
+  constructor() {
+    this.dbPromise = null;
+  }
+
+  open() {
+    if (!this.dbPromise) {
+      this.dbPromise = new Promise(resolve => {
+        if (typeof indexedDB === 'undefined') {
+          resolve(null);
+          return;
+        }
+        const request = indexedDB.open(DIAGRAM_CACHE_DB, 1);
+        request.onupgradeneeded = () => {
+          const store = request.result.createObjectStore(DIAGRAM_CACHE_STORE, { keyPath: 'key' });
+          store.createIndex('lastUsed', 'lastUsed');
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => {
+          console.warn('Diagram cache unavailable:', request.error);
+          resolve(null);
+        };
+      });
+    }
+    return this.dbPromise;
+  }
+
+  async transaction(mode, callback) {
+    const db = await this.open();
+    if (!db) return null;
+    return new Promise(resolve => {
+      const tx = db.transaction(DIAGRAM_CACHE_STORE, mode);
+      let result = null;
+      callback(tx.objectStore(DIAGRAM_CACHE_STORE), value => { result = value; });
+      tx.oncomplete = () => resolve(result);
+      tx.onerror = tx.onabort = () => resolve(null);
+    });
+  }
+
+  get(key) {
+    return this.transaction('readonly', (store, done) => {
+      store.get(key).onsuccess = event => done(event.target.result || null);
+    });
+  }
+
+  touch(record) {
+    record.lastUsed = Date.now();
+    return this.transaction('readwrite', store => store.put(record));
+  }
+
+  async put(key, etag, body, size) {
+    const now = Date.now();
+    await this.transaction('readwrite', store => {
+      store.put({ key, etag, body, size, storedAt: now, lastUsed: now });
+    });
+    await this.evict();
+  }
+
+  /**
+   * Drop least recently used entries beyond the count and size caps.
+   */
+  evict() {
+    return this.transaction('readwrite', store => {
+      const records = [];
+      store.index('lastUsed').openCursor(null, 'prev').onsuccess = event => {
+        const cursor = event.target.result;
+        if (cursor) {
+          records.push(cursor.value);
+          cursor.continue();
+          return;
+        }
+        let totalBytes = 0;
+        records.forEach((record, index) => {
+          totalBytes += record.size || 0;
+          if (index >= DIAGRAM_CACHE_MAX_ENTRIES || totalBytes > DIAGRAM_CACHE_MAX_BYTES) {
+            store.delete(record.key);
+          }
+        });
+      };
+    });
+  }
+}
+
+const diagramCache = new DiagramCache();
+
+/**
+ * Canonical cache key for a diagram request.
+ *
+ * Scoped to a hash of the API key so cached data is only served back to the
+ * credentials that fetched it. Formula order is kept since it sets the
+ * terminal order of the plot. Resolves to null (no caching) where Web Crypto
+ * is unavailable.
+ */
+async function diagramCacheKey(data, apiKey) {
+  if (typeof crypto === 'undefined' || !crypto.subtle) return null;
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(apiKey));
+  const keyHash = Array.from(new Uint8Array(digest).slice(0, 8))
+    .map(b => b.toString(16).padStart(2, '0'))
+    .join('');
+  return JSON.stringify([
+    keyHash,
+    data.f.map(f => f.replace(/\s+/g, '')),
+    Number(data.temp) || 0,
+    Number(data.e_cut),
+    data.functional
+  ]);
+}
+
 /**
  * Make API request to generate phase diagram
+ *
+ * Identical requests are answered from the browser cache: recent entries
+ * directly, older ones after an ETag revalidation. Pass an AbortSignal to
+ * cancel the request.
  */
-async function generatePhaseDiagram(data, apiKey) {
+async function generatePhaseDiagram(data, apiKey, signal = undefined) {
+  const key = await diagramCacheKey(data, apiKey);
+  const cached = key ? await diagramCache.get(key) : null;
+
+  if (cached && Date.now() - cached.storedAt < DIAGRAM_CACHE_FRESH_MS) {
+    diagramCache.touch(cached);
+    return cached.body;
+  }
+
+  const headers = {
+    'Content-Type': 'application/json',
+    'X-API-KEY': apiKey
+  };
+  if (cached && cached.etag) {
+    headers['If-None-Match'] = cached.etag;
+  }
+
   const response = await fetch(`${API_BASE_URL}/diagrams/`, {
     method: 'POST',
-    headers: {
-      'Content-Type': 'application/json',
-      'X-API-KEY': apiKey
-    },
-    body: JSON.stringify(data)
+    headers,
+    body: JSON.stringify(data),
+    signal
   });
 
+  if (response.status === 304 && cached) {
+    cached.storedAt = Date.now();
+    diagramCache.touch(cached);
+    return cached.body;
+  }
+
   if (!response.ok) {
     const errorData = await response.json().catch(() => ({ detail: 'Unknown error occurred' }));
     throw new Error(errorData.detail || `HTTP ${response.status}`);
   }
 
-  return await response.json();
+  const text = await response.text();
+  const result = JSON.parse(text);
+  if (key) {
+    diagramCache.put(key, response.headers.get('ETag'), result, new TextEncoder().encode(text).length);
+  }
+  return result;
 }
 
 /**
@@ -31,4 +183,4 @@ async function generatePhaseDiagram(data, apiKey) {
 async function checkHealth() {
   const response = await fetch(`${API_BASE_URL}/health/`);
   return await response.json();
-}
\ No newline at end of file
+}
@@ -5,6 +5,7 @@
 class UIManager {
   constructor() {
     this.elements = this.initializeElements();
+    this.currentRequest = null;
     this.initializeEventListeners();
     this.initializeTemperatureControls();
     this.restoreApiKeyFromStorage();
@@ -237,7 +238,7 @@ class UIManager {
     if (isLoading) {
       this.elements.submitText.style.display = 'none';
       this.elements.submitLoading.style.display = 'flex';
-      this.elements.submitBtn.disabled = true;
+      // Left enabled: re-submitting cancels the request in flight
     } else {
       this.elements.submitText.style.display = 'inline';
       this.elements.submitLoading.style.display = 'none';
@@ -374,6 +375,7 @@ class UIManager {
 
   async handleSubmit() {
     console.log('🚀 Form submission started');
+    let controller = null;
     
     try {
       // Validate inputs
@@ -404,6 +406,13 @@ class UIManager {
       
       console.log('Request data:', requestData);
       
+      // Cancel the previous submission instead of racing it
+      if (this.currentRequest) {
+        this.currentRequest.abort();
+      }
+      controller = new AbortController();
+      this.currentRequest = controller;
+      
       // Start loading state
       this.setLoadingState(true);
       this.showLoading();
@@ -415,11 +424,15 @@ class UIManager {
       this.updateProgress(2);
       await new Promise(resolve => setTimeout(resolve, 200));
       
-      const response = await generatePhaseDiagram(requestData, apiKey);
+      const response = await generatePhaseDiagram(requestData, apiKey, controller.signal);
       
       this.updateProgress(3);
       await new Promise(resolve => setTimeout(resolve, 200));
       
+      if (controller.signal.aborted) {
+        return;
+      }
+      
       console.log('Received response:', response);
       
       // Extract plot data and phase info
@@ -439,12 +452,14 @@ class UIManager {
         return;
       }
 
-      Plotly.newPlot(this.elements.plotDiv, plotData.data, plotData.layout, {
+      const renderStart = performance.now();
+      await Plotly.newPlot(this.elements.plotDiv, plotData.data, plotData.layout, {
         responsive: true,
         displayModeBar: true,
         modeBarButtonsToRemove: ['pan2d', 'lasso2d', 'select2d', 'autoScale2d'],
         displaylogo: false
       });
+      console.log(`Plot rendered in ${(performance.now() - renderStart).toFixed(0)} ms`);
       
       this.updateProgress(4);
       
@@ -456,10 +471,17 @@ class UIManager {
       console.log('✅ Phase diagram generated successfully');
       
     } catch (error) {
+      if (error.name === 'AbortError') {
+        console.log('Request superseded by a newer submission');
+        return;
+      }
       console.error('❌ Error generating phase diagram:', error);
       this.showError(error.message || 'An error occurred while generating the phase diagram');
     } finally {
-      this.setLoadingState(false);
+      if (this.currentRequest === controller) {
+        this.currentRequest = null;
+        this.setLoadingState(false);
+      }
     }
   }
 }
@@ -0,0 +1,17 @@
+"""Synthetic entries shared by the tests."""
+from pymatgen.core.composition import Composition
+from pymatgen.entries.computed_entries import ComputedEntry
+
+
+def make_entries():
+    """Small synthetic Ba-O-Si entry set."""
+    data = [
+        ("Ba", -1.9), ("O2", -9.8), ("Si", -10.8),
+        ("BaO", -13.5), ("BaO2", -17.5), ("SiO2", -24.0),
+        ("Ba2SiO4", -50.5), ("BaSiO3", -38.4), ("BaSi2O5", -63.2),
+        ("BaSiO3", -38.0), ("Ba2Si", -18.0), ("BaSi2", -23.9),
+    ]
+    return [
+        ComputedEntry(Composition(formula), energy, entry_id=f"mp-{i}")
+        for i, (formula, energy) in enumerate(data)
+    ]
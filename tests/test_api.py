@@ -1,6 +1,12 @@
 import pytest
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from app.main import app
+from app.models.responses import DiagramMetadata, DiagramResponse
+from app.services.materials_client import MaterialsProjectUnavailable
+from app.services.request_capture import RequestCapture
+from benchmarks.replay import load_capture
+from tests.helpers import make_entries
 
 client = TestClient(app)
 
@@ -51,4 +57,93 @@ def test_diagram_endpoint_invalid_functional():
         "e_cut": 0.2,
         "functional": "INVALID_FUNCTIONAL"
     }, headers={"X-API-KEY": "test_key_32_characters_long_123"})
-    assert response.status_code == 422  # Validation error
\ No newline at end of file
+    assert response.status_code == 422  # Validation error
+
+
+def test_diagram_endpoint_etag_revalidation():
+    """Test unchanged diagrams revalidate to an empty 304."""
+    result = DiagramResponse(
+        plot={"data": [], "layout": {}},
+        phase_info=[],
+        metadata=DiagramMetadata(temperature=0, elements=["Ba", "O"], e_cut=0.2,
+                                 functional="GGA_GGA_U", num_phases=0)
+    )
+    request = {"f": ["BaO", "SiO2"], "temp": 0, "e_cut": 0.2, "functional": "GGA_GGA_U"}
+    headers = {"X-API-KEY": "a" * 32}
+    
+    with patch("app.api.diagrams.PhaseAnalyzer.generate_phase_diagram", return_value=result):
+        response = client.post("/api/diagrams/", json=request, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["metadata"]["functional"] == "GGA_GGA_U"
+        etag = response.headers["ETag"]
+        
+        response = client.post("/api/diagrams/", json=request, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+    
+    # Non-finite numbers cannot be sent as JSON and are a server error
+    result.metadata.e_cut = float("nan")
+    with patch("app.api.diagrams.PhaseAnalyzer.generate_phase_diagram", return_value=result):
+        response = client.post("/api/diagrams/", json=request, headers=headers)
+    assert response.status_code == 500
+
+
+def test_export_endpoint_streams_csv():
+    """Test phase tables of several diagrams export as CSV with per-system errors."""
+    request = {"requests": [{"f": ["BaO", "SiO2"]}, {"f": ["BaO", "Xx"]}], "format": "csv"}
+    with patch("app.services.materials_client.MaterialsProjectClient.fetch_entries",
+               return_value=make_entries()):
+        response = client.post("/api/diagrams/export", json=request, headers={"X-API-KEY": "c" * 32})
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.strip().splitlines()
+    assert lines[0].startswith("request_index,system,")
+    assert sum(line.startswith("0,BaO-SiO2,") for line in lines) == 4
+    assert lines[-1].startswith("1,BaO-Xx,") and "Missing terminal entries" in lines[-1]
+
+
+def test_upstream_outage_returns_503_with_retry_after():
+    """Test an unavailable upstream is reported as 503 with Retry-After on every endpoint."""
+    outage = MaterialsProjectUnavailable("Materials Project is down", retry_after=7)
+    requests = [
+        ("/api/diagrams/data", {"f": ["BaO", "TiO2"]}),
+        ("/api/diagrams/stability", {"chemsys": "Ba-O-Ti", "compositions": ["BaTiO3"]}),
+    ]
+    with patch("app.services.materials_client.MaterialsProjectClient.fetch_entries", side_effect=outage):
+        for path, request in requests:
+            response = client.post(path, json=request, headers={"X-API-KEY": "d" * 32})
+            assert response.status_code == 503
+            assert response.headers["Retry-After"] == "7"
+
+
+def test_readiness_endpoint():
+    """Test readiness reports job counts and turns 503 when saturated."""
+    response = client.get("/api/health/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["in_flight"] == 0 and "diagram_cache" in data["cache_sizes"]
+    
+    with patch("app.services.admission.AdmissionController.saturated", True):
+        response = client.get("/api/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "saturated"
+
+
+def test_request_capture_records_bodies_without_keys(tmp_path):
+    """Test captured requests replay with their wire-format bodies and no API key."""
+    capture = RequestCapture(str(tmp_path / "capture.ndjson"), enabled=True)
+    request = {"f": ["BaO", "SiO2"], "temp": 0, "e_cut": 0.1, "functional": "GGA_GGA_U"}
+    
+    with patch("app.api.diagrams.request_capture", capture), \
+            patch("app.api.diagrams.PhaseAnalyzer.get_phase_data", side_effect=ValueError("no data")):
+        client.post("/api/diagrams/data", json=request, headers={"X-API-KEY": "d" * 32})
+        client.post("/api/diagrams/data", json={**request, "temp": 300}, headers={"X-API-KEY": "d" * 32})
+    
+    assert "d" * 32 not in (tmp_path / "capture.ndjson").read_text()
+    records = load_capture(str(tmp_path / "capture.ndjson"))
+    assert [r["endpoint"] for r in records] == ["/api/diagrams/data"] * 2
+    assert records[0]["body"] == {**request, "include_plot": True, "plot_formulas": None, "custom_entries": []}
+    assert records[1]["body"]["temp"] == 300
+    assert records[0]["offset"] == 0 and records[1]["offset"] >= 0
@@ -1,6 +1,10 @@
+import json
 import pytest
 from pydantic import ValidationError
-from app.models.requests import DiagramRequest, FormDiagramRequest
+from app.models.requests import (
+    ChemicalPotentialRequest, CustomEntry, DiagramRequest, FormDiagramRequest, HeatmapRequest,
+    ReactionProfileRequest, StabilityQueryRequest
+)
 from app.models.responses import PhaseInfo, DiagramMetadata
 
 
@@ -92,4 +96,54 @@ def test_diagram_metadata_model():
     
     assert metadata.temperature == 300
     assert metadata.elements == ["Fe", "O", "Al"]
-    assert metadata.num_phases == 5
\ No newline at end of file
+    assert metadata.num_phases == 5
+
+
+def test_stability_query_request_validation():
+    """Test StabilityQueryRequest validation."""
+    request = StabilityQueryRequest(
+        chemsys="Si-O-Ba",
+        compositions=["BaSiO3", " ", "Ba2SiO4"],
+        temp=0
+    )
+    assert request.chemsys == "Ba-O-Si"
+    assert request.compositions == ["BaSiO3", "Ba2SiO4"]
+    
+    # Too few elements
+    with pytest.raises(ValidationError):
+        StabilityQueryRequest(chemsys="Si", compositions=["Si"])
+    
+    # Invalid temperature
+    with pytest.raises(ValidationError):
+        StabilityQueryRequest(chemsys="Ba-O", compositions=["BaO"], temp=100)
+
+
+def test_custom_entry_rejects_non_finite_energy():
+    """Test custom entries need a finite energy per atom."""
+    entry = CustomEntry(formula=" Ba2SiO4 ", energy_per_atom=-7.5)
+    assert entry.formula == "Ba2SiO4"
+    
+    for value in (float("nan"), float("inf"), float("-inf")):
+        with pytest.raises(ValidationError):
+            CustomEntry(formula="Ba2SiO4", energy_per_atom=value)
+    
+    # NaN token in a request body, parsed as the framework does
+    body = json.loads('{"f": ["BaO", "SiO2"], "custom_entries": '
+                      '[{"formula": "Ba2SiO4", "energy_per_atom": NaN}]}')
+    with pytest.raises(ValidationError):
+        DiagramRequest(**body)
+
+
+def test_custom_entries_rejected_where_unused():
+    """Test endpoints that ignore custom entries reject them instead."""
+    custom = [{"formula": "Ba2SiO4", "energy_per_atom": -7.5}]
+    assert len(DiagramRequest(f=["BaO", "SiO2"], custom_entries=custom).custom_entries) == 1
+    
+    for model, extra in [
+        (ReactionProfileRequest, {"reactants": ["BaO", "SiO2"]}),
+        (HeatmapRequest, {}),
+        (ChemicalPotentialRequest, {}),
+    ]:
+        assert model(f=["BaO", "SiO2"], **extra).custom_entries == []
+        with pytest.raises(ValidationError, match="custom_entries"):
+            model(f=["BaO", "SiO2"], custom_entries=custom, **extra)
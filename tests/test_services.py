@@ -1,8 +1,32 @@
+import threading
+import time
 import pytest
-from unittest.mock import Mock, patch
-from app.services.materials_client import MaterialsProjectClient
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, Mock, patch
+from pymatgen.analysis.phase_diagram import CompoundPhaseDiagram, PhaseDiagram
+from pymatgen.core.composition import Composition
+from pymatgen.entries.computed_entries import ComputedEntry
+from app.services.admission import AdmissionController, AdmissionRejected
+from app.services.cache import TTLCache
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.client_pool import ClientPool, PoolSaturated, _count_received_bytes, received_bytes
+from app.services.compact_entries import CompactEntrySet
+from app.services.deadline import Deadline, RequestCancelled
+from app.services.entry_pruning import prune_entries
+from app.services.export import phase_table_batches
+from app.services.hull_queries import HullQuery, simplex_grid
+from app.services.hull_update import add_entries
+from app.services.materials_client import MaterialsProjectClient, MaterialsProjectUnavailable
+from app.services.phase_analyzer import PhaseAnalyzer
+from app.services.plot_builder import build_plot
+from app.services.plot_render import count_points, decimate_unstable, optimize_plot, use_webgl
 from app.services.rate_limiter import RateLimiter
+from app.models.requests import CustomEntry, DiagramRequest
+from app.core.config import settings
 from app.core.security import hash_api_key, validate_api_key
+from benchmarks.fixtures import make_oxide_entries
+from tests.helpers import make_entries
 
 
 def test_hash_api_key():
@@ -70,4 +94,741 @@ def test_rate_limiter():
     assert limiter.is_allowed(key) == False
     
     # Check remaining requests
-    assert limiter.get_remaining_requests(key) == 0
\ No newline at end of file
+    assert limiter.get_remaining_requests(key) == 0
+
+
+def test_ttl_cache():
+    """Test LRU eviction and expiry of the TTL cache."""
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" becomes most recently used
+    
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get_or_create("c", lambda: 99) == 3
+    
+    with patch("app.services.cache.time.time", return_value=1e12):
+        assert cache.get("a") is None
+
+
+def test_ttl_cache_stale_lookup():
+    """Test expired items are served as stale within the stale window."""
+    cache = TTLCache(max_size=2, ttl_seconds=60, stale_seconds=60)
+    with patch("app.services.cache.time.time", return_value=1000):
+        cache.set("a", 1)
+    
+    with patch("app.services.cache.time.time", return_value=1030):
+        assert cache.lookup("a") == (1, False)
+    with patch("app.services.cache.time.time", return_value=1090):
+        assert cache.get("a") is None
+        assert cache.lookup("a") == (1, True)
+    with patch("app.services.cache.time.time", return_value=1200):
+        assert cache.lookup("a") == (None, False)
+
+
+def test_hull_query_matches_pymatgen():
+    """Test vectorized hull queries against pymatgen's per-point results."""
+    phase_diagram = PhaseDiagram(make_entries())
+    query = HullQuery(phase_diagram)
+    
+    compositions = [Composition(f) for f in ["BaSiO3", "Ba3SiO5", "BaO3Si3", "SiO", "Ba", "Ba2Si3O"]]
+    fractions = query.fractions(compositions)
+    facet_idx, bary = query.locate(fractions)
+    hull_energies = query.hull_energies(facet_idx, bary)
+    decompositions = query.decompositions(facet_idx, bary)
+    
+    for comp, energy, decomp in zip(compositions, hull_energies, decompositions):
+        assert energy == pytest.approx(phase_diagram.get_hull_energy_per_atom(comp))
+        expected = phase_diagram.get_decomposition(comp)
+        assert {e.entry_id: pytest.approx(a) for e, a in expected.items()} == \
+            {e.entry_id: a for e, a in decomp.items()}
+    
+    with pytest.raises(ValueError):
+        query.fractions([Composition("Fe2O3")])
+
+
+def test_query_stability():
+    """Test batch stability queries reuse one cached phase diagram."""
+    client = MaterialsProjectClient("dummy_key_for_stability_tests")
+    client.fetch_entries = Mock(return_value=make_entries())
+    analyzer = PhaseAnalyzer(client)
+    
+    result = analyzer.query_stability(["Ba", "O", "Si"], ["BaSiO3", "Ba3SiO5"], 0, "GGA_GGA_U")
+    analyzer.query_stability(["Ba", "O", "Si"], ["SiO2"], 0, "GGA_GGA_U")
+    
+    assert client.fetch_entries.call_count == 1
+    stable, unknown = result.results
+    assert stable.e_above_hull == 0
+    assert stable.entry_id == "mp-7"
+    assert [p.formula for p in stable.decomposition] == ["BaSiO3"]
+    assert unknown.e_above_hull is None
+    assert sum(p.fraction for p in unknown.decomposition) == pytest.approx(1)
+
+
+def test_reaction_profile():
+    """Test the tie-line reaction profile against pymatgen hull energies."""
+    client = MaterialsProjectClient("dummy_key_for_profile_tests_12")
+    client.fetch_entries = Mock(return_value=make_entries())
+    analyzer = PhaseAnalyzer(client)
+    
+    profile = analyzer.get_reaction_profile(
+        ["BaO", "SiO2"], ["BaO", "SiO2"], 0, 0.2, "GGA_GGA_U", num_points=11
+    )
+    
+    assert profile.ratios[0] == 0 and profile.ratios[-1] == 1
+    assert profile.energies[0] == pytest.approx(0, abs=1e-4)
+    assert profile.energies[-1] == pytest.approx(0, abs=1e-4)
+    assert profile.reaction_energy_per_atom == min(profile.energies) < 0
+    assert {p.formula for p in profile.products} <= {"BaO", "SiO2", "Ba2SiO4", "BaSiO3", "BaSi2O5"}
+    
+    # Same diagram is reused by the main endpoint's builder
+    analyzer.get_compound_phase_diagram(["BaO", "SiO2"], 0, "GGA_GGA_U", 0.2)
+    assert client.fetch_entries.call_count == 1
+    
+    with pytest.raises(ValueError):
+        analyzer.get_reaction_profile(["BaO", "SiO2"], ["BaO", "Ba"], 0, 0.2, "GGA_GGA_U", 11)
+
+
+def test_simplex_grid():
+    """Test composition grid generation."""
+    grid = simplex_grid(3, 4)
+    assert len(grid) == 15  # C(4 + 2, 2)
+    assert (grid.sum(axis=1) == 4).all()
+    assert grid[0].tolist() == [0, 0, 4]
+    assert len(simplex_grid(4, 10)) == 286  # C(10 + 3, 3)
+
+
+def test_stability_heatmap():
+    """Test the heatmap against point-by-point pymatgen hull energies."""
+    client = MaterialsProjectClient("dummy_key_for_heatmap_tests_123")
+    client.fetch_entries = Mock(return_value=make_entries())
+    analyzer = PhaseAnalyzer(client)
+    
+    formulas = ["BaO", "SiO2", "Si"]
+    heatmap = analyzer.get_stability_heatmap(formulas, 0, 0.2, "GGA_GGA_U", resolution=6)
+    phase_diagram, _ = analyzer.get_compound_phase_diagram(formulas, 0, "GGA_GGA_U", 0.2)
+    
+    grid = simplex_grid(3, 6) / 6
+    assert len(heatmap.values) == len(heatmap.facets) == len(grid)
+    assert min(heatmap.values) >= 0
+    for fractions, value in zip(grid, heatmap.values):
+        comp = Composition(dict(zip(phase_diagram.elements, fractions)))
+        expected = -phase_diagram.get_form_energy_per_atom(
+            ComputedEntry(comp, phase_diagram.get_hull_energy(comp))
+        ) if comp.num_atoms else 0
+        assert value == pytest.approx(max(expected, 0), abs=1e-4)
+    assert all(0 <= f < len(heatmap.regions) for f in heatmap.facets)
+
+
+def test_prune_entries_preserves_hull():
+    """Test that pruning keeps the hull and every entry within the cutoff."""
+    entries = make_entries()
+    entries.append(ComputedEntry(Composition("BaSiO3"), -30.0, entry_id="mp-far"))
+    
+    kept, dropped = prune_entries(entries, energy_cutoff=0.2, margin=0.05)
+    assert dropped == 1
+    assert "mp-far" not in {e.entry_id for e in kept}
+    
+    full, pruned = PhaseDiagram(entries), PhaseDiagram(kept)
+    assert {e.entry_id for e in full.stable_entries} == {e.entry_id for e in pruned.stable_entries}
+    shown = {e.entry_id for e in full.all_entries if full.get_e_above_hull(e) <= 0.2}
+    assert shown <= {e.entry_id for e in kept}
+    
+    # Only the lowest polymorph survives a zero cutoff
+    kept, dropped = prune_entries(entries, energy_cutoff=0, margin=0)
+    assert dropped == 2
+
+
+def test_compact_entry_set_round_trip():
+    """Test that compact entries rebuild with identical energies and IDs."""
+    entries = make_entries()
+    entries.append(ComputedEntry(Composition("BaSiO3"), -38.2, correction=-1.4, entry_id="mp-corr"))
+    
+    compact = CompactEntrySet.from_entries(entries)
+    rebuilt = compact.to_entries()
+    
+    assert len(compact) == len(entries)
+    for orig, new in zip(entries, rebuilt):
+        assert new.composition == orig.composition
+        assert new.energy == pytest.approx(orig.energy)
+        assert new.correction == pytest.approx(orig.correction)
+        assert new.entry_id == orig.entry_id
+    
+    original_pd, rebuilt_pd = PhaseDiagram(entries), PhaseDiagram(rebuilt)
+    assert {e.entry_id for e in original_pd.stable_entries} == {e.entry_id for e in rebuilt_pd.stable_entries}
+
+
+def test_compound_views_share_elemental_diagram():
+    """Test terminal views derived from the cached elemental diagram match direct builds."""
+    client = MaterialsProjectClient("dummy_key_for_projection_tests_1")
+    client.fetch_entries = Mock(return_value=make_entries())
+    analyzer = PhaseAnalyzer(client)
+    
+    for formulas in (["BaO", "SiO2"], ["BaO", "BaSiO3"], ["Ba", "Si", "O"]):
+        derived, _ = analyzer.get_compound_phase_diagram(formulas, 0, "GGA_GGA_U")
+        direct = CompoundPhaseDiagram(make_entries(), [Composition(f) for f in formulas])
+        
+        def ids(entries):
+            return sorted(e.original_entry.entry_id for e in entries)
+        
+        assert ids(derived.all_entries) == ids(direct.all_entries)
+        assert ids(derived.stable_entries) == ids(direct.stable_entries)
+    
+    assert client.fetch_entries.call_count == 1
+
+
+def test_client_pool_reuse_and_limits():
+    """Test client reuse per key, concurrency caps and eviction."""
+    factory = Mock(side_effect=lambda api_key: MagicMock(name=api_key))
+    pool = ClientPool(max_clients=2, idle_seconds=60, max_concurrent=1,
+                      acquire_timeout=0.01, factory=factory)
+    key_a, key_b, key_c = ("a" * 32, "b" * 32, "c" * 32)
+    
+    with pool.session(key_a) as first:
+        # Second concurrent request for the same key exceeds the cap
+        with pytest.raises(PoolSaturated):
+            with pool.session(key_a):
+                pass
+    with pool.session(key_a) as second:
+        assert second is first
+    assert factory.call_count == 1
+    
+    # Pool is bounded: the least recently used idle client is closed
+    with pool.session(key_b), pool.session(key_c):
+        pass
+    assert len(pool) == 2
+    first.__exit__.assert_called_once()
+    
+    # Idle clients are closed on the next checkout
+    with patch("app.services.client_pool.time.time", return_value=1e12):
+        with pool.session(key_a):
+            assert pool.stats() == {"clients": 1, "in_use": 1}
+
+
+def test_received_bytes_counted_per_thread():
+    """Test responses on a shared client are counted for their own thread."""
+    rester = MagicMock()
+    rester.session.hooks = {}
+    _count_received_bytes(rester)
+    count = rester.session.hooks["response"][0]
+    
+    def fetch(size):
+        before = received_bytes()
+        count(Mock(content=b"x" * size))
+        return received_bytes() - before
+    
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert list(executor.map(fetch, [10, 20])) == [10, 20]
+    before = received_bytes()
+    count(Mock(content=None))
+    assert received_bytes() == before
+
+
+def test_parallel_subsystem_fetch():
+    """Test subsystem fetches are merged, deduped and cached individually."""
+    by_chemsys = {}
+    for entry in make_entries():
+        chemsys = "-".join(sorted(el.symbol for el in entry.composition))
+        by_chemsys.setdefault(chemsys, []).append(entry)
+    by_chemsys["Ba-O"].append(by_chemsys["Ba-O"][0])  # duplicate ID
+    
+    rester = MagicMock()
+    rester.get_entries.side_effect = lambda chemsys, **kwargs: list(by_chemsys.get(chemsys, []))
+    pool = ClientPool(factory=lambda api_key: rester)
+    
+    client = MaterialsProjectClient("dummy_key_for_parallel_fetch_12")
+    with patch("app.services.materials_client.client_pool", pool), \
+            patch.object(settings, "mp_slim_fetch", False):
+        entries = client.fetch_entries(["Ba", "O", "Si"], 0, "GGA_GGA_U")
+        assert rester.get_entries.call_count == 7
+        assert sorted(e.entry_id for e in entries) == sorted(e.entry_id for e in make_entries())
+        
+        # Ba-O-Ti shares Ba, O and Ba-O with the cached subsystems
+        client.fetch_entries(["Ba", "O", "Ti"], 0, "GGA_GGA_U")
+        assert rester.get_entries.call_count == 7 + 4
+        
+        # Oversized systems are rejected before any subsystem query
+        rester.reset_mock()
+        elements = ["Ba", "O", "Si", "Ti", "Mg", "Al", "Zn", "Ca", "Sr", "Li"]
+        with pytest.raises(ValueError, match="at most 9 elements"):
+            client.fetch_entries(elements, 0, "GGA_GGA_U")
+        rester.get_entries.assert_not_called()
+        rester.materials.thermo.search.assert_not_called()
+
+
+def test_slim_fetch_builds_entries_from_thermo_fields():
+    """Test slim fetching requests only hull fields and keeps energies exact."""
+    docs = [
+        {"material_id": "mp-1", "energy_type": "GGA+U", "composition": {"Ba": 1, "O": 1},
+         "energy_per_atom": -6.75, "uncorrected_energy_per_atom": -6.5},
+        {"material_id": "mp-2", "energy_type": "R2SCAN", "composition": {"Ba": 1},
+         "energy_per_atom": -1.9, "uncorrected_energy_per_atom": -1.9},
+    ]
+    rester = MagicMock()
+    rester.materials.thermo.search.return_value = docs
+    pool = ClientPool(factory=lambda api_key: rester)
+    
+    client = MaterialsProjectClient("dummy_key_for_slim_fetch_tests_1")
+    with patch("app.services.materials_client.client_pool", pool), \
+            patch.object(settings, "mp_parallel_fetch", False):
+        entries = client.fetch_entries(["Ba", "O"], 0, "GGA_GGA_U")
+    
+    kwargs = rester.materials.thermo.search.call_args.kwargs
+    assert "structure" not in kwargs["fields"] and "entries" not in kwargs["fields"]
+    assert sorted(kwargs["chemsys"]) == ["Ba", "Ba-O", "O"]
+    
+    bao = next(e for e in entries if e.entry_id == "mp-1-GGA+U")
+    assert bao.energy_per_atom == pytest.approx(-6.75)
+    assert bao.correction == pytest.approx(-0.5)
+    assert "mp-2-r2SCAN" in {e.entry_id for e in entries}
+
+
+def test_fetch_retries_and_circuit_breaker():
+    """Test upstream failures are retried, then open the circuit."""
+    client = MaterialsProjectClient("dummy_key_for_retry_tests_12345")
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=60)
+    fetch = Mock(side_effect=[ConnectionError("timeout"), make_entries()])
+    
+    with patch("app.services.materials_client.mp_breaker", breaker), \
+            patch.object(client, "_fetch_uncached", fetch), \
+            patch.object(settings, "mp_retry_backoff", 0.001):
+        entries = client.fetch_entries(["Ba", "O", "Si"], 0, "R2SCAN")
+        assert len(entries) == len(make_entries())
+        assert fetch.call_count == 2 and not breaker.is_open
+        
+        fetch.side_effect = ConnectionError("timeout")
+        with pytest.raises(MaterialsProjectUnavailable):
+            client.fetch_entries(["Ba", "O"], 0, "R2SCAN")
+        assert breaker.is_open
+        
+        # Open circuit fails fast without calling upstream
+        fetch.reset_mock()
+        with pytest.raises(MaterialsProjectUnavailable) as excinfo:
+            client.fetch_entries(["Ba", "Si"], 0, "R2SCAN")
+        assert fetch.call_count == 0
+        assert excinfo.value.retry_after > 0
+        
+        # Bad credentials are client errors and are not retried; as the trial
+        # call they close the circuit
+        fetch.side_effect = ValueError("Invalid Materials Project API key")
+        with patch("app.services.circuit_breaker.time.time", return_value=time.time() + 120), \
+                pytest.raises(ValueError):
+            client.fetch_entries(["Ba", "Ti"], 0, "R2SCAN")
+        assert fetch.call_count == 1 and not breaker.is_open
+        
+        # A saturated client pool is neither retried nor counted by the breaker
+        fetch.reset_mock()
+        fetch.side_effect = PoolSaturated("Too many concurrent requests", retry_after=1)
+        for chemsys in (["Ba", "Zr"], ["Ba", "Zn"]):
+            with pytest.raises(PoolSaturated):
+                client.fetch_entries(chemsys, 0, "R2SCAN")
+        assert fetch.call_count == 2 and not breaker.is_open
+    
+    # Other client errors and throttling are not retried and do not count
+    # towards opening the circuit shared by all API keys
+    with patch("app.services.materials_client.mp_breaker", breaker), \
+            patch.object(client, "_search_slim") as search:
+        for status, error in [(404, ValueError), (429, MaterialsProjectUnavailable)] * 2:
+            search.side_effect = Exception(f"REST query returned with error status code {status} on URL")
+            with pytest.raises(error):
+                client.fetch_entries(["Ba", "Ti"], 0, "R2SCAN")
+        assert search.call_count == 4 and not breaker.is_open
+
+
+def test_circuit_breaker_trial_owned_by_permit():
+    """Test only the trial call's permit can free the trial slot or close the circuit."""
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=60)
+    closed_permit, late_permit = breaker.allow(), breaker.allow()
+    breaker.record_failure(breaker.allow())
+    
+    with patch("app.services.circuit_breaker.time.time", return_value=time.time() + 120):
+        trial = breaker.allow()
+        assert trial is not None and breaker.allow() is None
+        
+        # Calls started before the circuit opened neither own the trial nor
+        # report on it
+        breaker.abandon(closed_permit)
+        breaker.record_success(closed_permit)
+        breaker.record_failure(late_permit)
+        assert breaker.is_open and breaker.allow() is None
+        
+        breaker.abandon(trial)
+        trial = breaker.allow()
+        breaker.record_success(trial)
+        assert not breaker.is_open
+        
+        # Nor do they count once it has closed again
+        breaker.record_failure(late_permit)
+        assert not breaker.is_open
+
+
+def test_stale_entries_served_while_refreshing():
+    """Test stale cached entries are returned at once and refreshed in the background."""
+    client = MaterialsProjectClient("dummy_key_for_stale_cache_test1")
+    cache = TTLCache(ttl_seconds=60, stale_seconds=600)
+    old, new = make_entries()[:3], make_entries()
+    executor = ThreadPoolExecutor(max_workers=1)
+    
+    with patch("app.services.materials_client.entry_cache", cache), \
+            patch("app.services.materials_client._refresh_executor", executor), \
+            patch.object(client, "_fetch_uncached", Mock(return_value=new)) as fetch:
+        key = client.cache_key(["Ba", "O", "Si"], 0, "R2SCAN")
+        with patch("app.services.cache.time.time", return_value=1000):
+            cache.set(key, CompactEntrySet.from_entries(old))
+        
+        with patch("app.services.cache.time.time", return_value=1100):
+            entries = client.fetch_entries(["Ba", "O", "Si"], 0, "R2SCAN")
+        assert len(entries) == len(old)
+        
+        executor.shutdown(wait=True)
+        assert fetch.call_count == 1
+        assert len(client.fetch_entries(["Ba", "O", "Si"], 0, "R2SCAN")) == len(new)
+
+
+def test_decimate_unstable_and_webgl():
+    """Test overlapping unstable points merge to the lowest-energy one."""
+    plot_data = {"data": [
+        {"type": "scatter", "mode": "lines", "x": [0, 1], "y": [0, 0]},
+        {"type": "scatter", "mode": "markers", "name": "Above Hull",
+         "x": [0.0, 0.001, 0.5, 1.0], "y": [0.0, 0.0, -1.0, -2.0],
+         "hovertext": ["A", "B", "C", "D"],
+         "marker": {"color": [0.3, 0.1, 0.2, 0.4], "colorscale": [[0, "red"], [1, "blue"]]}},
+    ]}
+    
+    # Small figures are left as built
+    assert optimize_plot(plot_data) == 0
+    assert plot_data["data"][1]["x"] == [0.0, 0.001, 0.5, 1.0]
+    assert plot_data["data"][1]["type"] == "scatter"
+    
+    assert decimate_unstable(plot_data, resolution=100) == 1
+    trace = plot_data["data"][1]
+    assert trace["x"] == [0.001, 0.5, 1.0]
+    assert trace["marker"]["color"] == [0.1, 0.2, 0.4]
+    assert trace["hovertext"][0] == "B<br>(+1 overlapping)"
+    assert count_points(plot_data) == 3
+    
+    assert use_webgl(plot_data)
+    assert [t["type"] for t in plot_data["data"]] == ["scatter", "scattergl"]
+
+
+def test_build_plot_matches_pdplotter():
+    """Test the native trace builder reproduces PDPlotter's figure for 2-4 components."""
+    import json
+    from pymatgen.analysis.phase_diagram import PDPlotter
+    terminals, oxides = make_oxide_entries(4, 150)
+    diagrams = [
+        CompoundPhaseDiagram(make_entries(), [Composition("BaO"), Composition("SiO2")]),
+        PhaseDiagram(make_entries()),
+        CompoundPhaseDiagram(oxides, [Composition(f) for f in terminals]),
+    ]
+    
+    def split(trace):
+        """Non-coordinate fields and coordinates, ternaries normalized as Plotly does."""
+        axes = [key for key in "abcxyz" if key in trace]
+        coords = np.array([[np.nan if v is None else v for v in trace[key]] for key in axes], dtype=float)
+        if "a" in trace:
+            coords = coords / coords.sum(axis=0)
+        return {k: v for k, v in trace.items() if k not in axes}, axes, coords
+    
+    for diagram in diagrams:
+        expected = json.loads(PDPlotter(diagram, backend="plotly", show_unstable=0.5).get_plot().to_json())
+        result = build_plot(diagram, 0.5)
+        
+        assert result["layout"] == expected["layout"]
+        assert len(result["data"]) == len(expected["data"])
+        for trace, reference in zip(result["data"], expected["data"]):
+            fields, axes, coords = split(trace)
+            expected_fields, expected_axes, expected_coords = split(reference)
+            assert fields == expected_fields
+            assert axes == expected_axes
+            assert np.allclose(coords, expected_coords, equal_nan=True)
+
+
+def test_phase_data_skips_plotting():
+    """Test data-only results list stable and near-hull unstable phases without plotting."""
+    client = MaterialsProjectClient("dummy_key_for_phase_data_test_1")
+    analyzer = PhaseAnalyzer(client)
+    
+    with patch.object(client, "fetch_entries", return_value=make_entries()), \
+            patch("app.services.phase_analyzer.PDPlotter") as plotter:
+        result = analyzer.get_phase_data(["BaO", "SiO2"], 0, 0.1, "GGA_GGA_U")
+        diagram = analyzer.generate_phase_diagram(
+            ["BaO", "SiO2"], 0, 0.1, "GGA_GGA_U", api_key=None, include_plot=False
+        )
+    
+    plotter.assert_not_called()
+    assert diagram.plot is None
+    assert sorted(p.formula for p in result.phase_info) == ["BaO", "BaSi2O5", "BaSiO3", "SiO2"]
+    assert result.unstable_phases == []  # Ba2SiO4 is 0.2 eV/atom above the hull
+    
+    with patch.object(client, "fetch_entries", return_value=make_entries()):
+        result = analyzer.get_phase_data(["BaO", "SiO2"], 0, 0.5, "GGA_GGA_U")
+    assert [(p.formula, p.e_above_hull) for p in result.unstable_phases] == [("Ba2SiO4", 0.2)]
+
+
+def test_admission_controller_sheds_when_queue_full():
+    """Test jobs beyond the running and queued limits are rejected at once."""
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+    release = threading.Event()
+    started = threading.Event()
+    
+    def slow():
+        started.set()
+        release.wait(5)
+        return "slow"
+    
+    results = []
+    running = threading.Thread(target=lambda: results.append(controller.run(slow)))
+    running.start()
+    started.wait(5)
+    queued = threading.Thread(target=lambda: results.append(controller.run(lambda: "queued")))
+    queued.start()
+    while controller.stats()["queued"] < 1:
+        time.sleep(0.01)
+    
+    assert controller.saturated
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.run(lambda: "rejected")
+    assert excinfo.value.retry_after >= 1
+    
+    release.set()
+    running.join(5)
+    queued.join(5)
+    assert results == ["slow", "queued"]
+    assert controller.stats()["in_flight"] == 0
+
+
+def test_admission_queue_drops_cancelled_requests():
+    """Test a queued job whose request is cancelled leaves the queue without running."""
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=5)
+    release = threading.Event()
+    started = threading.Event()
+    running = threading.Thread(target=controller.run, args=(lambda: started.set() or release.wait(5),))
+    running.start()
+    started.wait(5)
+    
+    deadline = Deadline(60)
+    job = Mock()
+    errors = []
+    
+    def queued():
+        try:
+            controller.run(job, key="k", deadline=deadline)
+        except RequestCancelled as e:
+            errors.append(e)
+    
+    waiting = threading.Thread(target=queued)
+    with patch.object(settings, "disconnect_poll_interval", 0.01):
+        waiting.start()
+        while controller.stats()["queued"] < 1:
+            time.sleep(0.01)
+        deadline.cancel("client disconnected")
+        waiting.join(5)
+    
+    assert len(errors) == 1 and not errors[0].timed_out
+    assert controller.stats()["queued"] == 0
+    job.assert_not_called()
+    
+    release.set()
+    running.join(5)
+    
+    # Once granted, the deadline is passed on to the job
+    deadline = Deadline(60)
+    controller.run(job, key="k", deadline=deadline)
+    job.assert_called_once_with(deadline=deadline)
+
+def test_admission_fair_across_keys():
+    """Test cheap jobs of one key are not starved by expensive jobs queued earlier by another."""
+    controller = AdmissionController(max_concurrent=1, max_queue=10, queue_timeout=5, max_per_key=1)
+    release = threading.Event()
+    started = threading.Event()
+    order = []
+    
+    def blocker():
+        started.set()
+        release.wait(5)
+    
+    threads = [threading.Thread(target=controller.run, args=(blocker,), kwargs={"key": "other"})]
+    threads[0].start()
+    started.wait(5)
+    
+    for key, cost in [("heavy", 4.0), ("heavy", 4.0), ("light", 1.0), ("light", 1.0)]:
+        thread = threading.Thread(
+            target=controller.run, args=(order.append, key), kwargs={"key": key, "cost": cost}
+        )
+        thread.start()
+        threads.append(thread)
+        while controller.stats()["queued"] < len(threads) - 1:
+            time.sleep(0.01)
+    
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    
+    assert order == ["light", "light", "heavy", "heavy"]
+
+
+def test_deadline_abandons_remaining_stages():
+    """Test cancelled or expired requests stop at the next stage instead of fetching or plotting."""
+    client = MaterialsProjectClient("dummy_key_for_deadline_test_123")
+    analyzer = PhaseAnalyzer(client)
+    
+    deadline = Deadline(60)
+    deadline.cancel("client disconnected")
+    with patch.object(client, "_fetch_uncached") as fetch:
+        with pytest.raises(RequestCancelled) as excinfo:
+            analyzer.generate_phase_diagram(
+                ["BaO", "SiO2"], 0, 0.1, "GGA_GGA_U", api_key=None, deadline=deadline
+            )
+    fetch.assert_not_called()
+    assert not excinfo.value.timed_out
+    
+    deadline = Deadline(0.05)
+    def slow_fetch(*args, **kwargs):
+        time.sleep(0.1)
+        return make_entries()
+    
+    with patch.object(client, "fetch_entries", side_effect=slow_fetch), \
+            patch("app.services.phase_analyzer.PDPlotter") as plotter:
+        with pytest.raises(RequestCancelled) as excinfo:
+            analyzer.generate_phase_diagram(
+                ["BaO", "SiO2"], 0, 0.1, "GGA_GGA_U", api_key=None, deadline=deadline
+            )
+    plotter.assert_not_called()
+    assert excinfo.value.timed_out
+
+
+def test_export_deadline_fails_remaining_systems_or_stops():
+    """Test an expired export budget turns into error rows and a cancelled export stops."""
+    client = MaterialsProjectClient("dummy_key_for_export_deadline_1")
+    client.fetch_entries = Mock(return_value=make_entries())
+    analyzer = PhaseAnalyzer(client)
+    requests = [DiagramRequest(f=["BaO", "SiO2"]), DiagramRequest(f=["BaO", "SiO2"], temp=300)]
+    
+    deadline = Deadline(0.01)
+    time.sleep(0.02)
+    batches = list(phase_table_batches(analyzer, requests, deadline=deadline))
+    assert [len(rows) for rows in batches] == [1, 1]
+    assert all("time budget" in rows[0]["error"] for rows in batches)
+    
+    deadline = Deadline(60)
+    deadline.cancel("client disconnected")
+    with pytest.raises(RequestCancelled):
+        list(phase_table_batches(analyzer, requests, deadline=deadline))
+
+
+def test_high_dimensional_diagram_without_plot_and_as_slice():
+    """Test five-component systems build in terminal space and plot only as a slice."""
+    formulas, entries = make_oxide_entries(5, 150)
+    client = MaterialsProjectClient("dummy_key_for_five_components_1")
+    client.fetch_entries = Mock(return_value=entries)
+    analyzer = PhaseAnalyzer(client)
+    
+    result = analyzer.generate_phase_diagram(
+        formulas, 0, 0.2, "GGA_GGA_U", api_key=None, include_plot=False
+    )
+    assert result.plot is None
+    assert result.metadata.num_pruned > 0
+    
+    # Pruning in terminal space leaves the hull unchanged
+    unpruned, _ = analyzer.get_compound_phase_diagram(formulas, 0, "GGA_GGA_U")
+    assert sorted(p.formula for p in result.phase_info) == sorted(
+        e.original_entry.composition.reduced_formula for e in unpruned.stable_entries
+    )
+    
+    with pytest.raises(ValueError, match="can be plotted"):
+        analyzer.generate_phase_diagram(formulas, 0, 0.2, "GGA_GGA_U", api_key=None)
+    
+    sliced = analyzer.generate_phase_diagram(
+        formulas, 0, 0.2, "GGA_GGA_U", api_key=None, plot_formulas=formulas[:3]
+    )
+    assert sliced.plot is not None and sliced.metadata.plot_formulas == formulas[:3]
+    assert len(sliced.phase_info) == len(result.phase_info)
+    assert client.fetch_entries.call_count == 1
+
+
+def test_custom_entries_update_cached_hull_incrementally():
+    """Test custom entries merge into the cached diagram and match a full rebuild."""
+    client = MaterialsProjectClient("dummy_key_for_custom_entries_01")
+    client.fetch_entries = Mock(return_value=make_entries())
+    analyzer = PhaseAnalyzer(client)
+    custom = [
+        CustomEntry(formula="Ba3SiO5", energy_per_atom=-7.4).to_entry("custom-1"),
+        CustomEntry(formula="BaSi2O5", energy_per_atom=-7.0, name="my-BaSi2O5").to_entry("custom-2"),
+    ]
+    
+    with patch("app.services.phase_analyzer.CompoundPhaseDiagram", wraps=CompoundPhaseDiagram) as built:
+        result = analyzer.generate_phase_diagram(
+            ["BaO", "SiO2"], 0, 0.1, "GGA_GGA_U", api_key=None, include_plot=False,
+            custom_entries=custom
+        )
+    assert built.call_count == 1
+    
+    direct = CompoundPhaseDiagram(
+        make_entries() + custom, [Composition("BaO"), Composition("SiO2")]
+    )
+    assert sorted(p.formula for p in result.phase_info) == sorted(
+        e.original_entry.composition.reduced_formula for e in direct.stable_entries
+    )
+    assert [(p.entry_id, p.stable) for p in result.custom_phases] == [
+        ("custom-1", True), ("my-BaSi2O5", False)
+    ]
+    above = {e.original_entry.entry_id: direct.get_e_above_hull(e) for e in direct.all_entries}
+    assert result.custom_phases[1].e_above_hull == pytest.approx(above["my-BaSi2O5"], abs=1e-4)
+    assert result.metadata.num_custom == 2
+    
+    # The merged diagram is a full compound diagram with the entries of a rebuild
+    base = CompoundPhaseDiagram(make_entries(), [Composition("BaO"), Composition("SiO2")])
+    merged_pd, _ = add_entries(base, custom)
+    assert isinstance(merged_pd, CompoundPhaseDiagram)
+    assert len(merged_pd.original_entries) == len(direct.original_entries)
+    assert len(merged_pd.all_entries) == len(direct.all_entries)
+    assert {e.original_entry.entry_id for e in merged_pd.stable_entries} == {
+        e.original_entry.entry_id for e in direct.stable_entries
+    }
+    
+    # Phase data lists every custom entry, including one above the cutoff that
+    # loses to the Materials Project polymorph, and merges them only once
+    with patch("app.services.phase_analyzer.add_entries", wraps=add_entries) as merged:
+        data = analyzer.get_phase_data(["BaO", "SiO2"], 0, 0.1, "GGA_GGA_U", custom_entries=custom)
+    assert merged.call_count == 1
+    assert data.custom_phases == result.custom_phases
+    assert all(p.entry_id != "my-BaSi2O5" for p in data.unstable_phases)
+    
+    with pytest.raises(ValueError, match="outside the terminal compositions"):
+        analyzer.generate_phase_diagram(
+            ["BaO", "SiO2"], 0, 0.1, "GGA_GGA_U", api_key=None, include_plot=False,
+            custom_entries=[CustomEntry(formula="BaSi2", energy_per_atom=-5.0).to_entry("custom-1")]
+        )
+
+
+def test_chemical_potential_diagram_reuses_cached_entries():
+    """Test chemical potential domains match pymatgen and share the diagram's fetch."""
+    from pymatgen.analysis.chempot_diagram import ChemicalPotentialDiagram
+    client = MaterialsProjectClient("dummy_key_for_chempot_tests_123")
+    client.fetch_entries = Mock(return_value=make_entries())
+    analyzer = PhaseAnalyzer(client)
+    
+    analyzer.generate_phase_diagram(["BaO", "SiO2"], 0, 0.1, "GGA_GGA_U", api_key=None, include_plot=False)
+    with patch("app.services.phase_analyzer.ChemicalPotentialDiagram", wraps=ChemicalPotentialDiagram) as built:
+        result = analyzer.get_chemical_potential_diagram(["BaO", "SiO2"], 0, "GGA_GGA_U")
+        again = analyzer.get_chemical_potential_diagram(["SiO2", "BaO"], 0, "GGA_GGA_U")
+    assert client.fetch_entries.call_count == 1
+    assert built.call_count == 1
+    assert again.domains == result.domains
+    
+    expected = ChemicalPotentialDiagram(make_entries()).domains
+    assert [d.formula for d in result.domains] == sorted(expected)
+    assert result.elements == [str(el) for el in ChemicalPotentialDiagram(make_entries()).elements]
+    for domain in result.domains:
+        vertices = np.array(domain.vertices)
+        assert np.allclose(
+            np.unique(vertices, axis=0), np.unique(np.round(expected[domain.formula], 4), axis=0)
+        )
+        # Polygon vertices in boundary order: consecutive edges turn the same way
+        edges = np.roll(vertices, -1, axis=0) - vertices
+        turns = np.cross(edges, np.roll(edges, -1, axis=0))
+        assert np.all(turns @ turns[0] > -1e-9)
+    assert {d.formula: d.entry_id for d in result.domains}["BaSiO3"] == "mp-7"